@@ -1,27 +1,55 @@
+import argparse
+import atexit
 import base64
+import copy
+import cProfile
+import functools
 import getpass
+import hashlib
+import html
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import re
+import shutil
+import sqlite3
+import string
+import pstats
 import sys
 import threading
 import time
+import unicodedata
+import zipfile
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
 
 import pandas as pd
 import pyautogui
 import requests
 import tkinter as tk
+import urllib3
 import yaml
 import keyboard
 from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from openpyxl import load_workbook
-from retry import retry
+from retry.api import retry_call
 from selenium import webdriver
+from selenium.common.exceptions import (
+    ElementClickInterceptedException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
 from selenium.webdriver.common.by import By
 from selenium.webdriver.edge.options import Options as EdgeOptions
 from selenium.webdriver.support import expected_conditions as EC
@@ -29,10 +57,22 @@ from selenium.webdriver.support.ui import Select, WebDriverWait
 from tkinter import messagebox
 
 try:
+    import pythoncom
     import win32com.client
 except ImportError:
+    pythoncom = None
     win32com = None
 
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
 
 @dataclass
 class AutomationConfig:
@@ -46,12 +86,1523 @@ class AutomationConfig:
     webdriver_path: Optional[str] = None
     contact_sheet_name: Optional[str] = None
     body_sheet_name: Optional[str] = None
+    profiling: Optional[Dict[str, Any]] = None
+    list_scan: Optional[Dict[str, Any]] = None
+    dom_extraction: bool = True
+    page_load: Optional[Dict[str, Any]] = None
+    retry_policies: Optional[Dict[str, Dict[str, Any]]] = None
+    circuit_breaker: Optional[Dict[str, Any]] = None
+    rate_limit: Optional[Dict[str, Any]] = None
+    logging: Optional[Dict[str, Any]] = None
+    account_name: Optional[str] = None
+    log_dir: Optional[str] = None
+    screenshot_source: str = 'desktop'
+    polling: Optional[Dict[str, Any]] = None
+    snapshot: Optional[Dict[str, Any]] = None
+    status_routes: Optional[List[Dict[str, Any]]] = None
+    progress: bool = True
+    lookahead: bool = False
+    resume_store: Optional[Dict[str, Any]] = None
+    downloads: Optional[Dict[str, Any]] = None
+    digest: Optional[Dict[str, Any]] = None
+    attachments: Optional[Dict[str, Any]] = None
+    eligibility: Optional[Dict[str, Any]] = None
+    branch_matching: Optional[Dict[str, Any]] = None
+    watchdog: Optional[Dict[str, Any]] = None
+
+
+RESUME_LINK_SELECTOR = "a[data-la='entry_detail_resume_btn_click']"
+OVERLAY_CLOSE_SELECTOR = "img[data-la='overlay_entry_detail_close_btn_click']"
+STATUS_SELECT_XPATH = "(//select[@data-select='selectBoxTable'])[1]"
+LIST_STATUS_FILTER_XPATH = "//select[@name='selectionStatus' and @data-select='selectBox']"
+
+# 詳細画面で必要な情報を1回のスクリプト実行でまとめて取得する
+DETAIL_EXTRACT_SCRIPT = """
+const resumeSelector = arguments[0], overlaySelector = arguments[1], statusXpath = arguments[2];
+const resume = document.querySelector(resumeSelector);
+const overlay = document.querySelector(overlaySelector);
+const select = document.evaluate(
+    statusXpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+).singleNodeValue;
+const fields = {};
+const root = overlay ? (overlay.closest('[role=dialog]') || document) : document;
+root.querySelectorAll('dl').forEach(function (dl) {
+    const terms = dl.querySelectorAll('dt');
+    terms.forEach(function (dt) {
+        const dd = dt.nextElementSibling;
+        const key = (dt.innerText || '').trim();
+        if (key && dd && !(key in fields)) {
+            fields[key] = (dd.innerText || '').trim();
+        }
+    });
+});
+return {
+    resume_href: resume ? (resume.href || resume.getAttribute('href') || '') : '',
+    overlay_present: !!overlay,
+    status: select ? {
+        value: select.value,
+        disabled: !!select.disabled,
+        options: Array.from(select.options).map(function (o) { return o.value; })
+    } : null,
+    fields: fields,
+    ready_state: document.readyState
+};
+"""
+
+
+# 詳細画面の本文が表示されてから、レジュメリンクの描画を待つ秒数
+DETAIL_RESUME_GRACE_SECONDS = 1.5
+
+
+# 画像・フォント・解析ビーコンなど、自動操作に不要なリソースの既定ブロック対象
+DEFAULT_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*/collect?*", "*/beacon*",
+]
+
+# Navigation Timing API から読み込み時間と転送量を取得する
+PAGE_TIMING_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let transfer = nav ? (nav.transferSize || 0) : 0;
+resources.forEach(function (r) { transfer += r.transferSize || 0; });
+return {
+    dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd - nav.startTime : null,
+    load_ms: nav ? nav.loadEventEnd - nav.startTime : null,
+    resource_count: resources.length,
+    transfer_bytes: transfer
+};
+"""
+
+
+class ApplicantRecord(NamedTuple):
+    """ループ内で使う応募者1件分の情報（DataFrameから一度だけ生成する）"""
+    B: str          # 氏名
+    E: Any          # 年齢（CSVの値そのまま）
+    I: str          # メールアドレス
+    AD: str         # 支店名（整形済み）
+    AK: str         # 職種
+    stem: str       # 添付ファイル名・チェックポイントのキー
+    ID: str = ""    # 応募者ID（一覧直接遷移モード時）
+    key: str = ""   # スナップショットの応募者キー
+    target_status: str = "04"  # 処理後に設定する選考ステータス
+    skip: str = ""  # 対象外とした条件（age / branch / job_type / duplicate）
+    source_status: str = ""  # 取得元の選考ステータス（検索時に一覧をこのステータスで絞り込む）
+
+
+class ContactRecord(NamedTuple):
+    branch: str
+    person: str
+    to: str
+    cc: str
+
+
+class DigestItem(NamedTuple):
+    # 支店ごとのまとめメールに載せる応募者1名分
+    record: "ApplicantRecord"
+    attachments: List[Path]
+    applicant_email: str
+    size: int
+
+
+def normalize_cell(value: Any) -> str:
+    if isinstance(value, str):
+        return value.strip()
+    if value is None or pd.isna(value):
+        return ""
+    return str(value).strip()
+
+
+# メールテンプレートで使える差し込み項目（日本語名でも指定可能）
+MAIL_PLACEHOLDERS = ("name", "age", "job_type", "branch", "email", "person", "count", "applicants")
+MAIL_PLACEHOLDER_ALIASES: Dict[str, str] = {
+    "氏名": "name",
+    "年齢": "age",
+    "職種": "job_type",
+    "支店": "branch",
+    "メール": "email",
+    "担当者": "person",
+    "人数": "count",
+    "応募者一覧": "applicants",
+}
+
+
+class MailTemplate:
+    """{氏名} 等の差し込み項目を読み込み時に分解しておき、応募者ごとに連結するだけで本文を作る"""
+
+    def __init__(self, text: str = "", source: str = "テンプレート"):
+        self.text = text
+        self.parts: List[Tuple[str, Optional[str]]] = []
+        try:
+            parsed = list(string.Formatter().parse(text))
+        except ValueError as exc:
+            raise AutomationError(f"{source} の書式が不正です（{{ }} の対応を確認してください）: {exc}")
+        unknown: List[str] = []
+        for literal, field, spec, conversion in parsed:
+            name = MAIL_PLACEHOLDER_ALIASES.get(field, field) if field is not None else None
+            if name is not None and (spec or conversion):
+                # 書式指定（{氏名:>10} や {氏名!r}）は差し込み時に反映されないため受け付けない
+                suffix = f"!{conversion}" if conversion else ""
+                suffix += f":{spec}" if spec else ""
+                raise AutomationError(f"{source} の差し込み項目に書式指定は使えません: {{{field}{suffix}}}")
+            if name is not None and name not in MAIL_PLACEHOLDERS:
+                unknown.append(field)
+            self.parts.append((literal, name))
+        if unknown:
+            available = "、".join(f"{{{alias}}}" for alias in MAIL_PLACEHOLDER_ALIASES)
+            raise AutomationError(
+                f"{source} に未対応の差し込み項目があります: {', '.join(unknown)}（使用可能: {available}）"
+            )
+        self.fields: Set[str] = {name for _, name in self.parts if name}
+
+    def __bool__(self) -> bool:
+        return bool(self.text)
+
+    def render(self, values: Dict[str, str]) -> str:
+        return "".join(literal + (values.get(name, "") if name else "") for literal, name in self.parts)
+
+
+def format_age(value: Any) -> str:
+    """年齢を表示用の文字列にする（欠損値があると列が float になるため 34.0 → 34、NaN → 空文字）"""
+    if isinstance(value, str):
+        return value.strip()
+    if value is None or pd.isna(value):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+# 照合時に無視する支店名の末尾（長いものから順に判定する）
+BRANCH_SUFFIXES = ("営業所", "事業所", "支店", "支社", "本店", "店")
+BRANCH_IGNORED_CHARS = re.compile(r"[\s・･\-‐－―()（）\[\]【】「」]")
+# あいまい一致の候補としてログに出す類似度の下限（送信に使うかは branch_matching の設定で決める）
+BRANCH_SUGGEST_SCORE = 0.5
+
+
+def normalize_branch_key(text: Any, strip_suffix: bool = True) -> str:
+    """NFKC正規化（全角/半角の統一）し、空白・記号（strip_suffix 時は末尾の「支店」等も）を除いた照合用キー"""
+    if not isinstance(text, str):
+        return ""
+    key = BRANCH_IGNORED_CHARS.sub("", unicodedata.normalize("NFKC", text)).lower()
+    if not strip_suffix:
+        return key
+    for suffix in BRANCH_SUFFIXES:
+        if key.endswith(suffix) and len(key) > len(suffix):
+            return key[: -len(suffix)]
+    return key
+
+
+class BranchMatch(NamedTuple):
+    contact: ContactRecord
+    score: float   # 1.0 = 完全一致、それ未満はあいまい一致の類似度
+    method: str    # exact / suffix（末尾の「支店」等を除いて一致）/ fuzzy
+
+
+class BranchIndex:
+    """連絡先シートの支店名から、正規化キーの完全一致索引とn-gramのあいまい一致索引を作る"""
+
+    def __init__(self, min_score: float = 0.6, ngram: int = 2):
+        self.min_score = min_score
+        self.ngram = ngram
+        self.exact: Dict[str, ContactRecord] = {}
+        # 末尾を除いたキー。別の送信先と重なる場合（東京本店/東京支店など）は None にして照合しない
+        self.loose: Dict[str, Optional[ContactRecord]] = {}
+        self.conflicts: List[str] = []
+        self.grams: List[Set[str]] = []
+        self.contacts: List[ContactRecord] = []
+        self.postings: Dict[str, List[int]] = {}
+        self.cache: Dict[str, Optional[BranchMatch]] = {}
+
+    def __len__(self) -> int:
+        return len(self.exact)
+
+    def ngrams(self, key: str) -> Set[str]:
+        padded = f"^{key}$"
+        n = self.ngram
+        return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+    def add(self, branch_name: str, contact: ContactRecord) -> None:
+        key = normalize_branch_key(branch_name, strip_suffix=False)
+        if not key:
+            return
+        existing = self.exact.get(key)
+        if existing is not None:
+            if existing != contact:
+                self.conflicts.append(f"{branch_name}: 同じ支店名の行が複数あるため最初の行（{existing.to}）を使用します")
+            return
+        self.exact[key] = contact
+        loose = normalize_branch_key(branch_name)
+        if loose not in self.loose:
+            self.loose[loose] = contact
+        elif self.loose[loose] is not None and self.loose[loose] != contact:
+            self.conflicts.append(
+                f"{branch_name} と {self.loose[loose].branch} は末尾を除くと同じ名前のため、完全一致でのみ照合します"
+            )
+            self.loose[loose] = None
+        position = len(self.contacts)
+        grams = self.ngrams(key)
+        self.contacts.append(contact)
+        self.grams.append(grams)
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(position)
+
+    def match(self, branch_name: str) -> Optional[BranchMatch]:
+        """支店名ごとに結果をキャッシュし、同じ支店の応募者では照合を繰り返さない"""
+        if branch_name in self.cache:
+            return self.cache[branch_name]
+        result = self._match(branch_name)
+        self.cache[branch_name] = result
+        return result
+
+    def _match(self, branch_name: str) -> Optional[BranchMatch]:
+        key = normalize_branch_key(branch_name, strip_suffix=False)
+        if not key:
+            return None
+        contact = self.exact.get(key)
+        if contact is not None:
+            return BranchMatch(contact, 1.0, "exact")
+        loose = normalize_branch_key(branch_name)
+        if loose in self.loose:
+            contact = self.loose[loose]
+            # 末尾を除くと複数の送信先に該当する場合は、あいまい一致でも採用しない
+            return BranchMatch(contact, 1.0, "suffix") if contact is not None else None
+        # 共通するn-gramを持つ支店のみを候補にし、Dice係数で類似度を計算する
+        query = self.ngrams(key)
+        shared: Counter = Counter()
+        for gram in query:
+            shared.update(self.postings.get(gram, ()))
+        best: Optional[BranchMatch] = None
+        ambiguous = False
+        for position, common in shared.items():
+            score = 2 * common / (len(query) + len(self.grams[position]))
+            if best is None or score > best.score:
+                best, ambiguous = BranchMatch(self.contacts[position], score, "fuzzy"), False
+            elif score == best.score and self.contacts[position] != best.contact:
+                ambiguous = True
+        if best is None or ambiguous or best.score < self.min_score:
+            return None
+        return best
+
+
+@dataclass
+class PrefetchedDetail:
+    # 先読みタブで開いておいた次の応募者の詳細画面
+    stem: str
+    handle: str
+    pdf_url: Optional[str]
+    payload: Optional[Dict[str, Any]]
+    direct: bool
+
+
+@dataclass
+class ListEntry:
+    applicant_id: str
+    detail_url: str
+    text: str = ""
+
+
+# 一覧ページの全行から応募者IDと詳細リンクを1回のスクリプト実行で取得する
+LIST_SCAN_SCRIPT = """
+const rows = Array.from(document.querySelectorAll(arguments[0]));
+return rows.map(function (tr) {
+    const link = tr.querySelector('a[href]');
+    const href = link ? link.href : (tr.dataset.href || '');
+    let id = tr.dataset.entryId || tr.dataset.id || '';
+    if (!id && href) {
+        const m = href.match(/(\\d{4,})(?!.*\\d{4,})/);
+        id = m ? m[1] : '';
+    }
+    return {id: id, href: href, text: (tr.innerText || '').trim()};
+});
+"""
 
 
 class AutomationError(Exception):
     pass
 
 
+class ApplicantTimeout(AutomationError):
+    # 応募者1件あたりの処理期限を超えた
+    pass
+
+
+class MailSendError(AutomationError):
+    # Outlook（COM）でのメール生成・送信に失敗した（pywintypes.com_error 等を包む）
+    pass
+
+
+# 応募者単位でスキップして処理を続ける例外（ウォッチドッグがブラウザを終了した際の通信エラーを含む）
+APPLICANT_ERRORS = (AutomationError, WebDriverException, requests.RequestException, urllib3.exceptions.HTTPError)
+
+
+LOG_FORMAT = '%(asctime)s [%(levelname)s] %(message)s'
+
+# 構造化ログに付与する応募者・ステップ情報
+_LOG_CONTEXT: ContextVar[Dict[str, Any]] = ContextVar("log_context", default={})
+
+
+def set_log_context(**fields: Any) -> None:
+    context = dict(_LOG_CONTEXT.get())
+    for key, value in fields.items():
+        if value is None:
+            context.pop(key, None)
+        else:
+            context[key] = value
+    _LOG_CONTEXT.set(context)
+
+
+class LogContextFilter(logging.Filter):
+    # QueueHandler 側（ログ出力元のスレッド）で文脈を記録に写す
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.log_context = dict(_LOG_CONTEXT.get())
+        return True
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """標準の prepare() はトレースバックを message に連結するため、exc_text として別に渡す"""
+
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+        # 例外オブジェクト（トレースバック）は別スレッドへ渡さない
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        payload.update(getattr(record, "log_context", {}) or {})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def prune_log_files(log_dir: Path, pattern: str, max_files: Optional[int], max_age_days: Optional[float]) -> int:
+    """保持件数・保持日数を超えた古いログを削除する"""
+    files = sorted(log_dir.glob(pattern), key=lambda f: f.stat().st_mtime, reverse=True)
+    cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+    removed = 0
+    for index, path in enumerate(files):
+        expired = cutoff is not None and path.stat().st_mtime < cutoff
+        if (max_files and index >= max_files) or expired:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+# 添付画像の変換形式 → 拡張子
+ATTACHMENT_FORMATS: Dict[str, str] = {"jpeg": ".jpg", "webp": ".webp", "pdf": ".pdf", "png": ".png"}
+IMAGE_FORMATS_BY_SUFFIX: Dict[str, str] = {".jpg": "jpeg", ".jpeg": "jpeg", ".webp": "webp", ".png": "png"}
+
+
+def optimize_image(
+    source: Path,
+    fmt: str = "jpeg",
+    quality: int = 70,
+    max_width: Optional[int] = None,
+    crop_box: Optional[Tuple[int, int, int, int]] = None,
+    max_bytes: Optional[int] = None,
+) -> Path:
+    """スクリーンショットを切り抜き・縮小して圧縮形式で保存し直す（別形式にした場合は元画像を削除する）"""
+    if Image is None:
+        raise AutomationError("Pillow がインポートできません")
+    target = source.with_suffix(ATTACHMENT_FORMATS[fmt])
+    with Image.open(source) as original:
+        img = original.convert("RGB") if fmt != "png" else original.copy()
+    if crop_box:
+        left, top, right, bottom = crop_box
+        box = (max(left, 0), max(top, 0), min(right, img.width), min(bottom, img.height))
+        if box[0] < box[2] and box[1] < box[3]:
+            img = img.crop(box)
+    if max_width and img.width > max_width:
+        img = img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+    for _ in range(6):
+        if fmt == "jpeg":
+            img.save(target, format="JPEG", quality=quality, optimize=True)
+        elif fmt == "webp":
+            img.save(target, format="WEBP", quality=quality, method=4)
+        elif fmt == "pdf":
+            img.save(target, format="PDF", resolution=150, quality=quality)
+        else:
+            img.save(target, format="PNG", optimize=True)
+        if not max_bytes or target.stat().st_size <= max_bytes:
+            break
+        # サイズ上限を超える場合は画質、次に解像度を下げて保存し直す
+        if fmt != "png" and quality > 40:
+            quality -= 15
+        else:
+            img = img.resize((max(img.width * 3 // 4, 1), max(img.height * 3 // 4, 1)), Image.LANCZOS)
+    if target != source and source.exists():
+        source.unlink()
+    return target
+
+
+DOWNLOAD_RUNS_DIR = "runs"
+DOWNLOAD_ARCHIVE_DIR = "archive"
+
+
+def _disk_usage(path: Path) -> int:
+    """削除で解放される容量（レジュメストアとハードリンクで共有しているファイルは除く）"""
+    if path.is_file():
+        stat = path.stat()
+        return stat.st_size if stat.st_nlink <= 1 else 0
+    total = 0
+    for child in path.rglob("*"):
+        try:
+            stat = child.stat()
+        except OSError:
+            continue
+        if child.is_file() and stat.st_nlink <= 1:
+            total += stat.st_size
+    return total
+
+
+def _archive_loose_file(path: Path, archive_dir: Path) -> None:
+    """実行フォルダを使わない構成のファイルを、更新日ごとのZIPに追記する"""
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    zip_path = archive_dir / f"{datetime.fromtimestamp(path.stat().st_mtime):%Y%m%d}.zip"
+    with zipfile.ZipFile(zip_path, "a", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.write(path, arcname=path.name)
+
+
+def prune_download_runs(
+    root: Path,
+    max_age_days: Optional[float],
+    max_total_gb: Optional[float],
+    archive: bool = True,
+    exclude: Optional[Path] = None,
+    store: Optional["ResumeStore"] = None,
+    keep_since: Optional[float] = None,
+) -> Counter:
+    """保持日数を過ぎた実行フォルダを圧縮（または削除）し、合計容量の上限を超えた分を古い順に削除する
+
+    per_run を使わない場合はダウンロードフォルダ直下のファイルを同じ方針で扱う
+    （keep_since 以降に更新されたファイルは実行中のものとして残す）。
+    レジュメストアはどのフォルダからも参照されなくなったPDFを対象にする。
+    """
+    runs_dir = root / DOWNLOAD_RUNS_DIR
+    archive_dir = root / DOWNLOAD_ARCHIVE_DIR
+    stats: Counter = Counter()
+    run_dirs = [d for d in runs_dir.glob("*") if d.is_dir() and d != exclude] if runs_dir.exists() else []
+    loose_files = [
+        p for p in root.glob("*")
+        if p.is_file() and not p.name.startswith(".")
+        and (keep_since is None or p.stat().st_mtime < keep_since)
+    ] if root.exists() else []
+    entries = sorted(run_dirs + loose_files, key=lambda p: p.stat().st_mtime)
+    cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+    for entry in list(entries):
+        if cutoff is None or entry.stat().st_mtime >= cutoff:
+            continue
+        if archive:
+            if entry.is_dir():
+                archive_dir.mkdir(parents=True, exist_ok=True)
+                shutil.make_archive(str(archive_dir / entry.name), "zip", root_dir=entry)
+            else:
+                _archive_loose_file(entry, archive_dir)
+            stats["archived"] += 1
+        else:
+            stats["removed"] += 1
+        if entry.is_dir():
+            shutil.rmtree(entry, ignore_errors=True)
+        else:
+            entry.unlink()
+        entries.remove(entry)
+    # 実行フォルダを削除した後で、参照されなくなった古いPDFを削除する
+    if store is not None:
+        stats["store_removed"] += store.prune(max_age_days)
+
+    if max_total_gb:
+        limit = int(max_total_gb * 1024 ** 3)
+        archives = list(archive_dir.glob("*.zip")) if archive_dir.exists() else []
+        objects = set(store.objects()) if store is not None else set()
+        entries = sorted(archives + entries + list(objects), key=lambda p: p.stat().st_mtime)
+        # ハードリンクで共有しているPDFはレジュメストア側で1回だけ数える
+        sizes = {entry: entry.stat().st_size if entry in objects else _disk_usage(entry) for entry in entries}
+        total = sum(sizes.values())
+        if exclude is not None and exclude != root and exclude.exists():
+            total += _disk_usage(exclude)
+        if keep_since is not None and root.exists():
+            total += sum(
+                _disk_usage(p) for p in root.glob("*")
+                if p.is_file() and not p.name.startswith(".") and p.stat().st_mtime >= keep_since
+            )
+        for entry in entries:
+            if total <= limit:
+                break
+            if entry in objects:
+                # 古い実行フォルダが先に削除されるので、その時点で参照が残っていなければ解放できる
+                if store.is_referenced(entry):
+                    continue
+                store.remove_object(entry)
+                stats["store_removed"] += 1
+            elif entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+                stats["removed"] += 1
+            else:
+                entry.unlink()
+                stats["removed"] += 1
+            total -= sizes[entry]
+        if store is not None and stats["store_removed"]:
+            store.save()
+    return stats
+
+
+# config.yaml の retry_on で指定できる例外名
+RETRYABLE_EXCEPTIONS: Dict[str, tuple] = {
+    "timeout": (TimeoutException,),
+    "stale": (StaleElementReferenceException,),
+    "click_intercepted": (ElementClickInterceptedException,),
+    "webdriver": (WebDriverException,),
+    "network": (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError),
+    "http": (requests.HTTPError,),
+}
+
+DEFAULT_RETRY_POLICIES: Dict[str, Dict[str, Any]] = {
+    "search": {
+        "attempts": 3, "delay": 2, "backoff": 2, "max_delay": 20, "jitter": [0, 1],
+        "retry_on": ["timeout", "stale", "click_intercepted", "webdriver"],
+    },
+    "download": {
+        "attempts": 3, "delay": 2, "backoff": 2, "max_delay": 30, "jitter": [0, 1],
+        "retry_on": ["network", "http"],
+    },
+    "status_update": {
+        "attempts": 2, "delay": 1, "backoff": 2, "max_delay": 10, "jitter": [0, 0.5],
+        "retry_on": ["timeout", "stale", "click_intercepted"],
+    },
+}
+
+
+@dataclass
+class RetryPolicy:
+    attempts: int = 1
+    delay: float = 0
+    backoff: float = 1
+    max_delay: Optional[float] = None
+    jitter: Any = 0
+    exceptions: tuple = (Exception,)
+
+    @classmethod
+    def from_config(cls, data: Dict[str, Any]) -> "RetryPolicy":
+        exceptions: tuple = ()
+        for name in data.get("retry_on") or []:
+            if name not in RETRYABLE_EXCEPTIONS:
+                raise AutomationError(f"retry_on に不明な例外名が指定されています: {name}")
+            exceptions += RETRYABLE_EXCEPTIONS[name]
+        jitter = data.get("jitter", 0)
+        return cls(
+            attempts=max(1, int(data.get("attempts", 1))),
+            delay=float(data.get("delay", 0)),
+            backoff=float(data.get("backoff", 1)),
+            max_delay=data.get("max_delay"),
+            jitter=tuple(jitter) if isinstance(jitter, (list, tuple)) else jitter,
+            exceptions=exceptions or (Exception,),
+        )
+
+    def call(self, func: Any, *args: Any, logger: Optional[logging.Logger] = None, **kwargs: Any) -> Any:
+        # 指数バックオフ + ジッタで再試行する（retry ライブラリを使用）
+        return retry_call(
+            func,
+            fargs=args,
+            fkwargs=kwargs,
+            exceptions=self.exceptions,
+            tries=self.attempts,
+            delay=self.delay,
+            max_delay=self.max_delay,
+            backoff=self.backoff,
+            jitter=self.jitter,
+            logger=logger,
+        )
+
+
+class CircuitBreaker:
+    """複数の応募者で連続して失敗した場合に処理全体を一時停止する"""
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 60, max_trips: int = 3):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.max_trips = max_trips
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.state = "closed"
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.state = "closed"
+
+    def reset(self) -> None:
+        self.record_success()
+        self.trips = 0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        # half-open 中の失敗は即座に再オープン
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            self.state = "open"
+            self.trips += 1
+
+    def cooldown_seconds(self) -> float:
+        # 連続してオープンするたびに待機時間を倍にする
+        return self.cooldown * (2 ** max(0, self.trips - 1))
+
+
+class TokenBucket:
+    """Airワークへのリクエストレートを制御するトークンバケット（スレッドセーフ）
+
+    429/5xx や応答遅延を検知するとレートを下げ（乗算減少）、
+    正常応答が続くと上限まで少しずつ戻す（加算増加）。
+    """
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        burst: int = 2,
+        min_rate: float = 0.1,
+        slow_threshold: float = 10.0,
+        decrease_factor: float = 0.5,
+        increase_step: float = 0.05,
+    ):
+        self.max_rate = max(0.01, float(rate))
+        self.rate = self.max_rate
+        self.burst = max(1, int(burst))
+        self.min_rate = min(self.max_rate, max(0.01, float(min_rate)))
+        self.slow_threshold = slow_threshold
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        """トークンを1つ予約し、使用可能になるまでの待機秒数を返す"""
+        with self._lock:
+            self._refill()
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self, sleep: Any = time.sleep) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            sleep(wait)
+        return wait
+
+    def record_response(self, status_code: Optional[int] = None, elapsed: Optional[float] = None) -> None:
+        throttled = status_code is not None and (status_code == 429 or status_code >= 500)
+        slow = elapsed is not None and elapsed > self.slow_threshold
+        with self._lock:
+            if throttled or slow:
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+
+# 一度処理を終えた応募者として扱う結果（内容が変わらない限り次回以降は処理しない）
+HANDLED_OUTCOMES = ("sent", "resumed", "skipped_age")
+
+# eligibility 未設定時は従来どおり55歳以上を対象外にする
+DEFAULT_ELIGIBILITY: Dict[str, Any] = {"age": {"max": 54}}
+ELIGIBILITY_RULE_LABELS: Dict[str, str] = {
+    "age": "年齢",
+    "invalid_age": "年齢不明",
+    "branch": "支店",
+    "job_type": "職種",
+    "duplicate": "重複",
+}
+SNAPSHOT_COLUMNS = ["B", "E", "I", "AD", "AK"]
+
+
+class SnapshotStore:
+    """過去のCSVエクスポートを応募者キー単位で保持し、新規・変更・変更なしを判定する"""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS applicants (
+                key TEXT PRIMARY KEY,
+                row_hash TEXT NOT NULL,
+                handled INTEGER NOT NULL DEFAULT 0,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def applicant_keys(df: pd.DataFrame) -> pd.Series:
+        # 応募者IDがあればそれを、なければ氏名とメールアドレスを安定キーとする
+        if "ID" in df.columns:
+            return df["ID"].astype(str)
+        return df["B"].fillna("").astype(str).str.strip() + "|" + df["I"].fillna("").astype(str).str.strip()
+
+    @staticmethod
+    def row_hashes(df: pd.DataFrame) -> pd.Series:
+        hashed = pd.util.hash_pandas_object(df[SNAPSHOT_COLUMNS].astype(str), index=False)
+        return hashed.map(lambda v: format(int(v), "016x"))
+
+    def classify(self, df: pd.DataFrame) -> pd.DataFrame:
+        """key / change / handled 列を付与して返す（change: new / changed / unchanged）"""
+        result = df.copy()
+        result["key"] = self.applicant_keys(df).values
+        result["row_hash"] = self.row_hashes(df).values
+        known = pd.read_sql_query("SELECT key, row_hash AS prev_hash, handled FROM applicants", self.conn)
+        merged = result[["key"]].merge(known, on="key", how="left")
+        prev_hash = merged["prev_hash"].values
+        result["change"] = "changed"
+        result.loc[pd.isna(prev_hash), "change"] = "new"
+        result.loc[result["row_hash"].values == prev_hash, "change"] = "unchanged"
+        result["handled"] = (merged["handled"].fillna(0).astype(int).values == 1) & (result["change"] == "unchanged")
+        return result
+
+    def save(self, df: pd.DataFrame) -> None:
+        now = datetime.now().isoformat(timespec="seconds")
+        rows = [(key, row_hash, now, now) for key, row_hash in zip(df["key"], df["row_hash"])]
+        # 内容が変わった応募者は未処理に戻す
+        self.conn.executemany(
+            """
+            INSERT INTO applicants (key, row_hash, handled, first_seen, last_seen)
+            VALUES (?, ?, 0, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                handled = CASE WHEN applicants.row_hash = excluded.row_hash THEN applicants.handled ELSE 0 END,
+                row_hash = excluded.row_hash,
+                last_seen = excluded.last_seen
+            """,
+            rows,
+        )
+        self.conn.commit()
+
+    def mark_handled(self, key: str) -> None:
+        self.conn.execute("UPDATE applicants SET handled = 1 WHERE key = ?", (key,))
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+# 失敗としてレポートに行を残す結果
+FAILURE_OUTCOMES = ("failed", "no_contact", "no_attachment")
+
+
+class RunReport:
+    """実行結果の集計（結果別件数・支店別件数・ステージ別所要時間・失敗一覧）"""
+
+    def __init__(self) -> None:
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self.outcomes: Counter = Counter()
+        self.events: Counter = Counter()
+        self.branches: Dict[str, Counter] = {}
+        self.stage_seconds: Counter = Counter()
+        self.stage_calls: Counter = Counter()
+        self.failures: List[Dict[str, str]] = []
+
+    def add_stage_time(self, stage: str, seconds: float) -> None:
+        self.stage_seconds[stage] += seconds
+        self.stage_calls[stage] += 1
+
+    def record(self, record: "ApplicantRecord", outcome: str, stage: str = "", reason: str = "") -> None:
+        self.outcomes[outcome] += 1
+        self.branches.setdefault(record.AD or "(支店なし)", Counter())[outcome] += 1
+        if outcome in FAILURE_OUTCOMES:
+            self.failures.append(
+                {
+                    "applicant": record.B,
+                    "branch": record.AD,
+                    "job_type": record.AK,
+                    "stem": record.stem,
+                    "outcome": outcome,
+                    "stage": stage,
+                    "reason": reason,
+                }
+            )
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self._started
+        processed = sum(self.outcomes.values())
+        minutes = elapsed / 60 if elapsed > 0 else 0
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "elapsed_seconds": round(elapsed, 1),
+            "processed": processed,
+            "applicants_per_minute": round(processed / minutes, 2) if minutes else 0.0,
+            "sent_per_minute": round(self.outcomes.get("sent", 0) / minutes, 2) if minutes else 0.0,
+            "outcomes": dict(self.outcomes),
+            "events": dict(self.events),
+            "branches": {branch: dict(counts) for branch, counts in sorted(self.branches.items())},
+            "stages": {
+                stage: {"seconds": round(seconds, 2), "calls": self.stage_calls[stage]}
+                for stage, seconds in self.stage_seconds.most_common()
+            },
+            "failures": self.failures,
+        }
+
+    def to_html(self, summary: Dict[str, Any]) -> str:
+        def table(headers: List[str], rows: List[List[Any]]) -> str:
+            head = "".join(f"<th>{html.escape(str(h))}</th>" for h in headers)
+            body = "".join(
+                "<tr>" + "".join(f"<td>{html.escape(str(c))}</td>" for c in row) + "</tr>" for row in rows
+            )
+            return f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>"
+
+        outcome_names = sorted({o for counts in summary["branches"].values() for o in counts})
+        counts = list(summary["outcomes"].items()) + list(summary["events"].items())
+        sections = [
+            "<h1>Airワーク自動処理 実行レポート</h1>",
+            table(
+                ["開始", "終了", "所要時間(秒)", "処理件数", "件/分", "送信件/分"],
+                [[
+                    summary["started_at"], summary["finished_at"], summary["elapsed_seconds"],
+                    summary["processed"], summary["applicants_per_minute"], summary["sent_per_minute"],
+                ]],
+            ),
+            "<h2>結果別件数</h2>",
+            table(["結果", "件数"], [[k, v] for k, v in counts]),
+            "<h2>支店別件数</h2>",
+            table(
+                ["支店"] + outcome_names,
+                [[b] + [c.get(o, 0) for o in outcome_names] for b, c in summary["branches"].items()],
+            ),
+            "<h2>ステージ別所要時間</h2>",
+            table(["ステージ", "秒", "回数"], [[k, v["seconds"], v["calls"]] for k, v in summary["stages"].items()]),
+            "<h2>失敗一覧</h2>",
+            table(
+                ["応募者", "支店", "職種", "結果", "ステージ", "理由"],
+                [
+                    [f["applicant"], f["branch"], f["job_type"], f["outcome"], f["stage"], f["reason"]]
+                    for f in summary["failures"]
+                ],
+            ),
+        ]
+        style = (
+            "body{font-family:sans-serif}table{border-collapse:collapse;margin-bottom:1em}"
+            "td,th{border:1px solid #999;padding:2px 8px}"
+        )
+        return (
+            f"<!DOCTYPE html><html lang='ja'><head><meta charset='utf-8'><title>実行レポート</title>"
+            f"<style>{style}</style></head><body>{''.join(sections)}</body></html>"
+        )
+
+    def save(self, stem: Path) -> List[Path]:
+        summary = self.summary()
+        json_path = stem.with_name(f"{stem.name}_report.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        html_path = stem.with_name(f"{stem.name}_report.html")
+        with open(html_path, "w", encoding="utf-8") as f:
+            f.write(self.to_html(summary))
+        return [json_path, html_path]
+
+
+class ResumeStore:
+    """ハッシュをキーにレジュメPDFを保存し、ファイル名（stem）→ハッシュの対応を管理する"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.manifest_path = root / "manifest.json"
+        self.manifest: Dict[str, Dict[str, Any]] = {}
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path, encoding="utf-8") as f:
+                    self.manifest = dict(json.load(f) or {})
+            except (OSError, ValueError):
+                self.manifest = {}
+
+    def object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}.pdf"
+
+    def lookup(self, stem: str) -> Optional[Dict[str, Any]]:
+        entry = self.manifest.get(stem)
+        if entry and self.object_path(entry["sha256"]).exists():
+            return entry
+        return None
+
+    def conditional_headers(self, stem: str) -> Dict[str, str]:
+        entry = self.lookup(stem) or {}
+        headers: Dict[str, str] = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def is_current(self, stem: str, resp: requests.Response) -> bool:
+        """サーバー応答のヘッダーから、保存済みのPDFが最新かを判定する"""
+        entry = self.lookup(stem)
+        if not entry:
+            return False
+        if resp.status_code == 304:
+            return True
+        etag = resp.headers.get("ETag")
+        if etag and entry.get("etag"):
+            return etag == entry["etag"]
+        size = resp.headers.get("Content-Length")
+        last_modified = resp.headers.get("Last-Modified")
+        return bool(
+            last_modified and size
+            and last_modified == entry.get("last_modified")
+            and int(size) == int(entry.get("size", -1))
+        )
+
+    def put(self, stem: str, part_path: Path, digest: str, size: int, resp: requests.Response) -> Path:
+        object_path = self.object_path(digest)
+        if object_path.exists():
+            # 同じ内容のPDFは保存済みのものを共有する
+            part_path.unlink()
+        else:
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(part_path, object_path)
+        self.manifest[stem] = {
+            "sha256": digest,
+            "size": size,
+            "etag": resp.headers.get("ETag", ""),
+            "last_modified": resp.headers.get("Last-Modified", ""),
+            "fetched_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self.save()
+        return object_path
+
+    def materialize(self, stem: str, target_path: Path) -> None:
+        """添付用のファイル名で保存済みPDFをハードリンクする（別ドライブ等で不可ならコピー）"""
+        entry = self.lookup(stem)
+        if not entry:
+            raise AutomationError(f"レジュメストアに登録されていません: {stem}")
+        object_path = self.object_path(entry["sha256"])
+        if target_path.exists():
+            try:
+                if target_path.samefile(object_path):
+                    return
+            except OSError:
+                pass
+            target_path.unlink()
+        try:
+            os.link(object_path, target_path)
+        except OSError:
+            shutil.copy2(object_path, target_path)
+        # 保持期間は最後に使われた日時から数える
+        os.utime(object_path)
+
+    def objects(self) -> List[Path]:
+        objects_dir = self.root / "objects"
+        return list(objects_dir.glob("*/*.pdf")) if objects_dir.exists() else []
+
+    @staticmethod
+    def is_referenced(object_path: Path) -> bool:
+        """ダウンロードフォルダ側にハードリンクが残っていれば使用中とみなす"""
+        try:
+            return object_path.stat().st_nlink > 1
+        except OSError:
+            return False
+
+    def remove_object(self, object_path: Path) -> None:
+        """PDFを削除し、それを指すマニフェストのエントリも取り除く"""
+        digest = object_path.stem
+        object_path.unlink(missing_ok=True)
+        self.manifest = {
+            stem: entry for stem, entry in self.manifest.items() if entry.get("sha256") != digest
+        }
+
+    def prune(self, max_age_days: Optional[float]) -> int:
+        """どのダウンロードフォルダからも参照されず、保持日数を過ぎたPDFを削除する"""
+        removed = 0
+        if max_age_days:
+            cutoff = time.time() - max_age_days * 86400
+            for object_path in self.objects():
+                if not self.is_referenced(object_path) and object_path.stat().st_mtime < cutoff:
+                    self.remove_object(object_path)
+                    removed += 1
+        # 実体のなくなったエントリも掃除する
+        stale = [stem for stem, entry in self.manifest.items() if not self.object_path(entry["sha256"]).exists()]
+        for stem in stale:
+            del self.manifest[stem]
+        if removed or stale:
+            self.save()
+        return removed
+
+    def save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+
+class DeadLetterQueue:
+    """処理に失敗した応募者を失敗ステージ・エラー内容とともに保存する"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if path.exists():
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.entries = dict(json.load(f).get("entries") or {})
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def add(self, record: "ApplicantRecord", outcome: str, stage: str, reason: str, detail_url: str = "") -> None:
+        now = datetime.now().isoformat(timespec="seconds")
+        previous = self.entries.get(record.stem) or {}
+        self.entries[record.stem] = {
+            "record": record._asdict(),
+            "detail_url": detail_url or previous.get("detail_url", ""),
+            "outcome": outcome,
+            "stage": stage,
+            "error": reason,
+            "attempts": int(previous.get("attempts", 0)) + 1,
+            "first_failed_at": previous.get("first_failed_at", now),
+            "last_failed_at": now,
+        }
+        self.save()
+
+    def remove(self, stem: str) -> None:
+        if self.entries.pop(stem, None) is not None:
+            self.save()
+
+    def records(self) -> List["ApplicantRecord"]:
+        return [ApplicantRecord(**entry["record"]) for entry in self.entries.values()]
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": self.entries}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class ProgressDisplay:
+    """コンソール1行に進捗（件数・現在のステージ・件/分・残り時間・キュー件数）を表示する"""
+
+    def __init__(self, stream: Any = None, min_interval: float = 0.5, window: int = 10):
+        self.stream = stream or sys.stderr
+        self.enabled = bool(getattr(self.stream, "isatty", lambda: False)())
+        self.min_interval = min_interval
+        self.total = 0
+        self.done = 0
+        self.stage = ""
+        self.queues: Dict[str, int] = {}
+        self._completed_at: deque = deque(maxlen=window)
+        self._stage_started = time.perf_counter()
+        self._last_render = 0.0
+        self._last_width = 0
+        self._line = ""
+        self._lock = threading.Lock()
+
+    def start(self, total: int) -> None:
+        self.total = total
+        self.done = 0
+        self._completed_at.clear()
+        self._completed_at.append(time.perf_counter())
+        self.render(force=True)
+
+    def set_stage(self, stage: str) -> None:
+        self.stage = stage
+        self._stage_started = time.perf_counter()
+        self.render()
+
+    def set_queue(self, name: str, depth: int) -> None:
+        self.queues[name] = depth
+
+    def advance(self) -> None:
+        self.done += 1
+        self._completed_at.append(time.perf_counter())
+        self.render(force=self.done >= self.total)
+
+    def rate_per_minute(self) -> float:
+        # 直近の完了時刻から移動平均で算出する
+        if len(self._completed_at) < 2:
+            return 0.0
+        span = self._completed_at[-1] - self._completed_at[0]
+        return (len(self._completed_at) - 1) / span * 60 if span > 0 else 0.0
+
+    def render(self, force: bool = False) -> None:
+        if not self.enabled or not self.total:
+            return
+        now = time.perf_counter()
+        if not force and now - self._last_render < self.min_interval:
+            return
+        with self._lock:
+            self._last_render = now
+            rate = self.rate_per_minute()
+            remaining = max(0, self.total - self.done)
+            eta = f"{int(remaining / rate * 60) // 60:d}分{int(remaining / rate * 60) % 60:02d}秒" if rate > 0 else "--"
+            queues = " ".join(f"{name}:{depth}" for name, depth in self.queues.items())
+            stage = f"{self.stage}({now - self._stage_started:.0f}s)" if self.stage else "-"
+            line = (
+                f"[{self.done}/{self.total}] ステージ:{stage} {rate:.1f}件/分 "
+                f"残り:{remaining}件 ETA:{eta} {queues}"
+            )
+            # cmd.exe でも動くよう、エスケープシーケンスではなく空白で前回の表示を消す
+            self.stream.write("\r" + line.ljust(self._last_width))
+            self._last_width = len(line)
+            self._line = line
+            if self.done >= self.total:
+                self.stream.write("\n")
+                self._line = ""
+            self.stream.flush()
+
+    @contextmanager
+    def suspended(self) -> Iterator[None]:
+        """進捗行を一旦消して別の出力（ログ）を書き、その後で進捗行を描き直す"""
+        with self._lock:
+            active = self.enabled and bool(self._line)
+            if active:
+                self.stream.write("\r" + " " * self._last_width + "\r")
+            try:
+                yield
+            finally:
+                if active:
+                    self.stream.write(self._line)
+                    self.stream.flush()
+
+
+class ProgressAwareStreamHandler(logging.StreamHandler):
+    """進捗行の表示中は、進捗行を消してからログを出力する（同じ stderr に書くため）"""
+
+    def __init__(self, stream: Any = None):
+        super().__init__(stream)
+        self.progress: Optional[ProgressDisplay] = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        progress = self.progress
+        if progress is None:
+            super().emit(record)
+            return
+        with progress.suspended():
+            super().emit(record)
+
+
+def timed_stage(stage: str) -> Any:
+    """メソッドの所要時間を実行レポートのステージ別時間に計上し、進捗表示のステージを更新する"""
+    def decorator(func: Any) -> Any:
+        @functools.wraps(func)
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            self.progress.set_stage(stage)
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                self.report.add_stage_time(stage, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class RunCancelled(BaseException):
+    # 個別処理の except Exception に握りつぶされないよう BaseException を継承する
+    pass
+
+
+class CancellationToken:
+    """ESCキー等による協調的キャンセルを各ステップへ伝えるトークン"""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self.reason = ""
+        self._deadline: Optional[float] = None
+
+    def cancel(self, reason: str = "") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def set_deadline(self, seconds: Optional[float]) -> None:
+        """以降の待機・キャンセル確認で、期限を過ぎていれば ApplicantTimeout を送出する"""
+        self._deadline = time.monotonic() + seconds if seconds else None
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise RunCancelled(self.reason)
+        deadline = self._deadline
+        if deadline is not None and time.monotonic() >= deadline:
+            raise ApplicantTimeout("応募者1件あたりの処理期限を超えました")
+
+    def wait(self, seconds: float) -> None:
+        # 待機中にキャンセルされたら即座に抜ける（処理期限までしか待たない）
+        timeout = max(0.0, seconds)
+        deadline = self._deadline
+        if deadline is not None:
+            timeout = min(timeout, max(0.0, deadline - time.monotonic()))
+        if self._event.wait(timeout):
+            raise RunCancelled(self.reason)
+        self.raise_if_cancelled()
+
+
+class BrowserWatchdog:
+    """応募者ごとの処理期限を設定し、期限を大きく超えても戻らない場合はブラウザを強制終了する"""
+
+    def __init__(self, token: CancellationToken, timeout: float, grace: float, on_hang: Any):
+        self.token = token
+        self.timeout = timeout
+        self.grace = grace
+        self.on_hang = on_hang
+        self.label = ""
+        self._hard_deadline: Optional[float] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def arm(self, label: str) -> None:
+        self.label = label
+        self.token.set_deadline(self.timeout)
+        self._hard_deadline = time.monotonic() + self.timeout + self.grace
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="browser-watchdog", daemon=True)
+            self._thread.start()
+
+    def disarm(self) -> None:
+        self.token.set_deadline(None)
+        self._hard_deadline = None
+
+    def stop(self) -> None:
+        self.disarm()
+        self._stopped.set()
+
+    def _run(self) -> None:
+        # WebDriver呼び出しが固まるとメインスレッドでは期限を確認できないため別スレッドで監視する
+        while not self._stopped.wait(1.0):
+            hard_deadline = self._hard_deadline
+            if hard_deadline is not None and time.monotonic() >= hard_deadline:
+                self._hard_deadline = None
+                self.on_hang(self.label)
+
+
+class CancellableWait(WebDriverWait):
+    """ポーリングのたびにキャンセル状態を確認する WebDriverWait"""
+
+    def __init__(self, driver: Any, timeout: float, token: CancellationToken, **kwargs: Any):
+        super().__init__(driver, timeout, **kwargs)
+        self.token = token
+
+    def until(self, method: Any, message: str = "") -> Any:
+        def checked(driver: Any) -> Any:
+            self.token.raise_if_cancelled()
+            return method(driver)
+
+        return super().until(checked, message)
+
+
+class RunCheckpoint:
+    """中断時に再開できるよう、応募者ごとの処理段階を保存する"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.csv_path = ""
+        self.stages: Dict[str, str] = {}
+
+    def load(self, csv_path: str) -> None:
+        self.csv_path = csv_path
+        self.stages = {}
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        # CSVは実行ごとに再取得されるため、応募者キー単位で引き継ぐ
+        self.stages = dict(data.get("stages") or {})
+
+    def stage(self, key: str) -> Optional[str]:
+        return self.stages.get(key)
+
+    def mark(self, key: str, stage: str) -> None:
+        self.stages[key] = stage
+        self.save()
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"csv_path": self.csv_path, "updated_at": datetime.now().isoformat(), "stages": self.stages},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        # メール送信済みでステータス未更新の応募者は、再送しないよう次回の実行へ引き継ぐ
+        self.stages = {key: stage for key, stage in self.stages.items() if stage == "mailed"}
+        if self.stages:
+            self.save()
+            return
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+PROFILE_MODES = ("cprofile", "sampling")
+
+
+class RunProfiler:
+    """実行プロファイラ（cProfile / サンプリング + WebDriverコマンド数・待機時間の計測）"""
+
+    def __init__(self, mode: str, artifact_stem: Path, interval: float = 0.01):
+        if mode not in PROFILE_MODES:
+            raise AutomationError(f"不明なプロファイルモードです: {mode}")
+        self.mode = mode
+        self.artifact_stem = artifact_stem
+        self.interval = max(0.001, float(interval))
+        self.command_counts: Counter = Counter()
+        self.command_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.started_at = 0.0
+        self.finished_at = 0.0
+        self._wait_depth = 0
+        self._lock = threading.Lock()
+        self._profile: Optional[cProfile.Profile] = None
+        self._samples: Counter = Counter()
+        self._sampler: Optional[threading.Thread] = None
+        self._sampling = threading.Event()
+        self._target_thread_id = threading.get_ident()
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._target_thread_id = threading.get_ident()
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._sampling.set()
+            self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+            self._sampler.start()
+
+    def stop(self) -> None:
+        if self._profile is not None:
+            self._profile.disable()
+        if self._sampler is not None:
+            self._sampling.clear()
+            self._sampler.join(timeout=1)
+        self.finished_at = time.perf_counter()
+
+    def _sample_loop(self) -> None:
+        while self._sampling.is_set():
+            frame = sys._current_frames().get(self._target_thread_id)
+            stack: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).name}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self._samples[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    @contextmanager
+    def track_wait(self) -> Iterator[None]:
+        # 入れ子になった待機は最も外側のみを計上する
+        with self._lock:
+            self._wait_depth += 1
+            outermost = self._wait_depth == 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._wait_depth -= 1
+                if outermost:
+                    self.wait_seconds += time.perf_counter() - started
+
+    def record_command(self, command: str, elapsed: float) -> None:
+        with self._lock:
+            self.command_counts[command] += 1
+            self.command_seconds += elapsed
+
+    def instrument_driver(self, driver: Any) -> None:
+        """WebDriverの全コマンドを計数し、待機時間として計上する"""
+        original_execute = driver.execute
+
+        def execute(driver_command: str, params: Optional[Dict[str, Any]] = None) -> Any:
+            started = time.perf_counter()
+            try:
+                with self.track_wait():
+                    return original_execute(driver_command, params)
+            finally:
+                self.record_command(driver_command, time.perf_counter() - started)
+
+        driver.execute = execute
+
+    def instrument_wait(self, browser_wait: WebDriverWait) -> None:
+        original_until = browser_wait.until
+
+        def until(method: Any, message: str = "") -> Any:
+            with self.track_wait():
+                return original_until(method, message)
+
+        browser_wait.until = until
+
+    def summary(self) -> Dict[str, Any]:
+        end = self.finished_at or time.perf_counter()
+        wall = max(0.0, end - self.started_at)
+        return {
+            "mode": self.mode,
+            "wall_seconds": round(wall, 3),
+            "wait_seconds": round(self.wait_seconds, 3),
+            "compute_seconds": round(max(0.0, wall - self.wait_seconds), 3),
+            "webdriver_command_seconds": round(self.command_seconds, 3),
+            "webdriver_command_total": sum(self.command_counts.values()),
+            "webdriver_commands": dict(self.command_counts.most_common()),
+        }
+
+    def save(self) -> List[Path]:
+        saved: List[Path] = []
+        stem = self.artifact_stem
+        if self._profile is not None:
+            prof_path = stem.with_suffix(".prof")
+            self._profile.dump_stats(str(prof_path))
+            saved.append(prof_path)
+            text_path = stem.with_name(f"{stem.name}_profile.txt")
+            with open(text_path, "w", encoding="utf-8") as f:
+                stats = pstats.Stats(self._profile, stream=f)
+                stats.sort_stats("cumulative").print_stats(60)
+            saved.append(text_path)
+        if self._samples:
+            # flamegraph.pl / speedscope でそのまま読める collapsed 形式
+            folded_path = stem.with_name(f"{stem.name}_samples.folded")
+            with open(folded_path, "w", encoding="utf-8") as f:
+                for stack, count in self._samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            saved.append(folded_path)
+        summary_path = stem.with_name(f"{stem.name}_profile.json")
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        saved.append(summary_path)
+        return saved
+
+
 def check_password(password: str) -> bool:
     key = b'yCh_OE7jEoX7S9aUMuk-CCNiJT_GIfb1ZHkLO8b5jbw='
     cipher = b'gAAAAABnwUPuHzq3v84PkAwHhqeiqE2WnXY-2IxdOoZeOHfyeKVTToWfh89_8WQRTPGxJFJ40aoorfQLbb0-3pMRgX-cA2m41g=='
@@ -76,10 +1627,54 @@ def derive_key(password: str, salt: bytes) -> bytes:
     return base64.urlsafe_b64encode(key)
 
 
+def read_config_data(config_path: Path) -> Dict[str, Any]:
+    """config.yaml を読み込む。存在しない場合や .enc が指定された場合は復号して読み込む"""
+    if config_path.suffix != '.enc' and config_path.exists():
+        # 通常のconfig.yamlが見つかった場合
+        with open(config_path, encoding='utf-8') as f:
+            return yaml.safe_load(f) or {}
+
+    # config.yamlがない場合、config.encを探す
+    enc_path = config_path.with_suffix('.enc')
+    if not enc_path.exists():
+        raise AutomationError(f"設定ファイルが見つかりません。{config_path} または {enc_path} を配置してください")
+    print("=" * 50)
+    print("設定ファイル復号")
+    print("=" * 50)
+    try:
+        password = getpass.getpass(f"{enc_path.name} の復号パスワードを入力してください: ")
+
+        with open(enc_path, 'rb') as f:
+            salt = f.read(16)  # 最初の16バイトはソルト
+            encrypted_data = f.read()
+
+        key = derive_key(password, salt)
+        fernet = Fernet(key)
+        decrypted_data = fernet.decrypt(encrypted_data)
+
+        # YAMLとしてロード
+        data = yaml.safe_load(decrypted_data.decode('utf-8')) or {}
+        print("✓ 暗号化された設定ファイルを正常に読み込みました")
+        return data
+
+    except InvalidToken:
+        raise AutomationError("設定ファイルの復号に失敗: パスワードが間違っているか、ファイルが破損しています")
+    except Exception as exc:
+        raise AutomationError(f"設定ファイルの復号中にエラーが発生しました: {exc}")
+
+
 class AutomationScript:
-    def __init__(self, config_path: str):
-        self.setup_logging()
-        self.config = self.load_config(config_path)
+    def __init__(
+        self,
+        config_path: str,
+        profile_mode: Optional[str] = None,
+        config_data: Optional[Dict[str, Any]] = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.config = self.load_config(config_path, config_data)
+        self.setup_logging(self.config.logging or {})
+        self.profiler = self.create_profiler(profile_mode)
+        self.paused_seconds = 0.0
         # pyautoguiの設定
         pyautogui.PAUSE = 0.5
         pyautogui.FAILSAFE = True
@@ -89,56 +1684,121 @@ class AutomationScript:
 
         self.driver: Optional[webdriver.Edge] = None
         self.browser_wait: Optional[WebDriverWait] = None
-        self.running = True
-        threading.Thread(target=self._monitor_esc, daemon=True).start()
+        self.cancel_token = CancellationToken()
+        self.checkpoint = RunCheckpoint(self.run_stem.parent / "checkpoint.json")
+        self.list_index: Dict[str, ListEntry] = {}
+        self.detail_payload: Optional[Dict[str, Any]] = None
+        self.list_url = ""
+        self.list_status = ""
+        self.prefetched: Optional[PrefetchedDetail] = None
+        self.mail_executor: Optional[ThreadPoolExecutor] = None
+        self.digest_items: Dict[ContactRecord, List[DigestItem]] = {}
+        self.mail_subject = MailTemplate()
+        self.session_applicants = 0
+        self.browser_hung = False
+        self.watchdog = self.create_watchdog()
+        self.mail_body = MailTemplate()
+        self.attachment_executor: Optional[ThreadPoolExecutor] = None
+        self.pending_attachments: Dict[Path, Future] = {}
+        self.started_at = time.time()
+        self.download_root = Path(self.config.download_folder).expanduser().resolve()
+        self.download_dir = self.new_download_dir()
+        self.resume_store = self.create_resume_store()
+        self.webdriver_commands = 0
+        self.outcomes: Counter = Counter()
+        self.report = RunReport()
+        self.progress = ProgressDisplay()
+        self.progress.enabled = self.progress.enabled and self.config.progress
+        self.console_handler.progress = self.progress
+        self.dead_letters = DeadLetterQueue(self.run_stem.parent / "dead_letters.json")
+        self.snapshot_store: Optional[SnapshotStore] = None
+        self.retry_policies = self.load_retry_policies()
+        self.rate_limiter = self.create_rate_limiter()
+        breaker_settings = self.config.circuit_breaker or {}
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(breaker_settings.get('failure_threshold', 5)),
+            cooldown=float(breaker_settings.get('cooldown', 60)),
+            max_trips=int(breaker_settings.get('max_trips', 3)),
+        )
+        self._esc_hook = keyboard.on_press_key('esc', self._on_esc)
 
-    def setup_logging(self) -> None:
+    def setup_logging(self, settings: Dict[str, Any]) -> None:
         log_dir = Path(__file__).parent / "logs"
+        if self.config.log_dir:
+            log_dir = Path(self.config.log_dir).expanduser()
+            if not log_dir.is_absolute():
+                log_dir = Path(__file__).parent / log_dir
         log_dir.mkdir(parents=True, exist_ok=True)
-        log_file = log_dir / f"automation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s [%(levelname)s] %(message)s',
-            handlers=[logging.FileHandler(log_file), logging.StreamHandler()],
+        # プロファイル等の成果物はローテーション方式によらず実行単位の名前で保存する
+        self.run_stem = log_dir / f"automation_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        rotation = settings.get('rotation', 'per_run')
+        structured = settings.get('format', 'text') == 'json'
+        suffix = ".jsonl" if structured else ".log"
+
+        if rotation == 'size':
+            self.log_file = log_dir / f"automation{suffix}"
+            file_handler: logging.Handler = logging.handlers.RotatingFileHandler(
+                self.log_file,
+                maxBytes=int(settings.get('max_bytes', 10 * 1024 * 1024)),
+                backupCount=int(settings.get('backup_count', 10)),
+                encoding='utf-8',
+            )
+        elif rotation == 'time':
+            self.log_file = log_dir / f"automation{suffix}"
+            file_handler = logging.handlers.TimedRotatingFileHandler(
+                self.log_file,
+                when=settings.get('when', 'midnight'),
+                backupCount=int(settings.get('backup_count', 30)),
+                encoding='utf-8',
+            )
+        elif rotation == 'per_run':
+            retention = settings.get('retention') or {}
+            prune_log_files(
+                log_dir,
+                f"automation_*{suffix}",
+                retention.get('max_files', 30),
+                retention.get('max_age_days'),
+            )
+            self.log_file = self.run_stem.with_suffix(suffix)
+            file_handler = logging.FileHandler(self.log_file, encoding='utf-8')
+        else:
+            raise AutomationError(f"logging.rotation の値が不正です: {rotation}")
+
+        file_handler.setFormatter(JsonLineFormatter() if structured else logging.Formatter(LOG_FORMAT))
+        stream_handler = ProgressAwareStreamHandler()
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        self.console_handler = stream_handler
+
+        # ディスク・コンソールへの書き込みは QueueListener のスレッドで行い、呼び出し側をブロックしない
+        log_queue: queue.Queue = queue.Queue(-1)
+        queue_handler = ContextQueueHandler(log_queue)
+        queue_handler.addFilter(LogContextFilter())
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(getattr(logging, str(settings.get('level', 'INFO')).upper(), logging.INFO))
+        self.log_listener = logging.handlers.QueueListener(
+            log_queue, file_handler, stream_handler, respect_handler_level=True
         )
+        self.log_listener.start()
+        atexit.register(self.log_listener.stop)
         self.logger = logging.getLogger(__name__)
 
-    def load_config(self, path: str) -> AutomationConfig:
-        config_path = Path(path)
-        data = {}
+    def flush_logging(self) -> None:
+        # キューに残ったログを書き出してからリスナーを再開する
+        listener = getattr(self, "log_listener", None)
+        if listener is None:
+            return
+        listener.stop()
+        for handler in listener.handlers:
+            handler.flush()
+        listener.start()
 
-        if config_path.exists():
-            # 通常のconfig.yamlが見つかった場合
-            with open(config_path, encoding='utf-8') as f:
-                data = yaml.safe_load(f) or {}
-        else:
-            # config.yamlがない場合、config.encを探す
-            enc_path = config_path.with_suffix('.enc')
-            if enc_path.exists():
-                print("=" * 50)
-                print("設定ファイル復号")
-                print("=" * 50)
-                try:
-                    password = getpass.getpass("config.enc の復号パスワードを入力してください: ")
-                    
-                    with open(enc_path, 'rb') as f:
-                        salt = f.read(16)  # 最初の16バイトはソルト
-                        encrypted_data = f.read()
-
-                    key = derive_key(password, salt)
-                    fernet = Fernet(key)
-                    decrypted_data = fernet.decrypt(encrypted_data)
-                    
-                    # YAMLとしてロード
-                    data = yaml.safe_load(decrypted_data.decode('utf-8')) or {}
-                    self.logger.info("暗号化された設定ファイルを正常に読み込みました")
-                    
-                except InvalidToken:
-                    raise AutomationError("設定ファイルの復号に失敗: パスワードが間違っているか、ファイルが破損しています")
-                except Exception as exc:
-                    raise AutomationError(f"設定ファイルの復号中にエラーが発生しました: {exc}")
-            else:
-                raise AutomationError(f"設定ファイルが見つかりません。{config_path} または {enc_path} を配置してください")
+    def load_config(self, path: str, data: Optional[Dict[str, Any]] = None) -> AutomationConfig:
+        if data is None:
+            data = read_config_data(Path(path))
+        data = dict(data)
 
         if not data.get('edge_path'):
             raise AutomationError("設定ファイルに edge_path が設定されていません")
@@ -154,21 +1814,265 @@ class AutomationScript:
         data['password'] = password
         return AutomationConfig(**data)
 
-    def _monitor_esc(self) -> None:
-        while self.running:
-            if keyboard.is_pressed('esc'):
-                self.logger.warning("ESCキー検知：強制終了")
-                self.cleanup(close_browser=True)
-                os._exit(0)
-            time.sleep(0.3)
+    def create_resume_store(self) -> Optional[ResumeStore]:
+        settings = self.config.resume_store or {}
+        if not settings.get('enabled'):
+            return None
+        root = settings.get('path') or self.download_root / ".resume_store"
+        return ResumeStore(Path(root).expanduser().resolve())
+
+    def watchdog_settings(self) -> Dict[str, Any]:
+        return self.config.watchdog or {}
+
+    def create_watchdog(self) -> Optional[BrowserWatchdog]:
+        settings = self.watchdog_settings()
+        if not settings.get('enabled') or not settings.get('applicant_timeout'):
+            return None
+        return BrowserWatchdog(
+            self.cancel_token,
+            float(settings['applicant_timeout']),
+            float(settings.get('hang_grace', 30)),
+            self._on_browser_hang,
+        )
+
+    def _on_browser_hang(self, label: str) -> None:
+        # ウォッチドッグのスレッドから呼ばれる。ブラウザを終了して固まったWebDriver呼び出しを解放する
+        self.logger.error(f"ブラウザが応答しないため強制終了します: {label}")
+        self.browser_hung = True
+        driver = self.driver
+        if driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def arm_deadline(self, label: str) -> None:
+        if self.watchdog is not None:
+            self.watchdog.arm(label)
+
+    def disarm_deadline(self) -> None:
+        if self.watchdog is not None:
+            self.watchdog.disarm()
+
+    def browser_memory_mb(self) -> Optional[float]:
+        """Edge全体（msedgedriver配下のプロセス）の使用メモリ。psutil がない場合は None"""
+        if psutil is None or not self.driver:
+            return None
+        try:
+            service = psutil.Process(self.driver.service.process.pid)
+            return sum(p.memory_info().rss for p in service.children(recursive=True)) / 1024 / 1024
+        except (psutil.Error, AttributeError):
+            return None
+
+    def browser_health(self) -> str:
+        """ブラウザの再生成が必要な理由を返す（問題なければ空文字）"""
+        if self.browser_hung:
+            return "ブラウザが応答しませんでした"
+        if not self.driver:
+            return ""
+        settings = self.watchdog_settings()
+        recycle_after = int(settings.get('recycle_after', 0) or 0)
+        if recycle_after and self.session_applicants >= recycle_after:
+            return f"{self.session_applicants} 件処理しました"
+        started = time.perf_counter()
+        try:
+            heap = self.driver.execute_script(
+                "return performance.memory ? performance.memory.usedJSHeapSize : 0;"
+            )
+            tabs = len(self.driver.window_handles)
+        except WebDriverException as exc:
+            return f"WebDriverが応答しません: {exc}"
+        response = time.perf_counter() - started
+        memory_mb = self.browser_memory_mb()
+        if memory_mb is None:
+            # psutil がない場合は表示中のページのJSヒープで代用する
+            memory_mb = float(heap or 0) / 1024 / 1024
+        self.logger.debug(f"ブラウザ状態: 応答 {response:.2f}秒 / メモリ {memory_mb:.0f}MB / タブ {tabs}")
+        max_response = settings.get('max_response_seconds')
+        if max_response and response > float(max_response):
+            return f"応答時間 {response:.1f}秒"
+        max_memory = settings.get('max_memory_mb')
+        if max_memory and memory_mb > float(max_memory):
+            return f"メモリ使用量 {memory_mb:.0f}MB"
+        max_tabs = settings.get('max_tabs')
+        if max_tabs and tabs > int(max_tabs):
+            return f"タブ数 {tabs}"
+        return ""
+
+    def maintain_browser(self, status_value: str = "") -> None:
+        """応募者の処理前にブラウザの状態を確認し、必要ならログイン・一覧の絞り込みまで復元して作り直す"""
+        if self.watchdog is None:
+            return
+        reason = self.browser_health()
+        if not reason:
+            return
+        self.logger.warning(f"ブラウザセッションを再生成します: {reason}")
+        self.report.events["session_recycled"] += 1
+        self.prefetched = None
+        self.restart_session()
+        self.navigate_entries()
+        # URLに絞り込み条件が残るとは限らないため、処理中のルートのステータスで検索し直す
+        status = status_value or self.list_status
+        if status:
+            self.filter_entries(status)
+        elif self.list_url:
+            self.driver.get(self.list_url)
+            self.pause(self.config.wait_time.get('browser', 4))
+
+    def download_settings(self) -> Dict[str, Any]:
+        return self.config.downloads or {}
+
+    def new_download_dir(self) -> Path:
+        """per_run 有効時は実行ごとのフォルダ（runs/<日時>）を保存先にする"""
+        if not self.download_settings().get('per_run'):
+            return self.download_root
+        return self.download_root / DOWNLOAD_RUNS_DIR / datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    def rotate_download_dir(self) -> None:
+        """常駐モードでは日付が変わったら保存先を新しい実行フォルダに切り替える"""
+        if self.download_dir == self.download_root:
+            return
+        if self.download_dir.name[:8] == datetime.now().strftime('%Y%m%d'):
+            return
+        self.download_dir = self.new_download_dir()
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+        self.logger.info(f"ダウンロード先を切り替えました: {self.download_dir}")
+        if self.driver:
+            self.apply_download_behavior(self.driver)
+        self.cleanup_downloads()
+
+    def apply_download_behavior(self, driver: webdriver.Edge) -> None:
+        try:
+            driver.execute_cdp_cmd(
+                "Page.setDownloadBehavior",
+                {
+                    "behavior": "allow",
+                    "downloadPath": str(self.download_dir),
+                    "eventsEnabled": True,
+                },
+            )
+        except Exception as exc:
+            self.logger.warning(f"ダウンロード設定の適用に失敗しました: {exc}")
 
+    def cleanup_downloads(self) -> Counter:
+        retention = self.download_settings().get('retention') or {}
+        if not retention:
+            return Counter()
+        stats = prune_download_runs(
+            self.download_root,
+            retention.get('max_age_days'),
+            retention.get('max_total_gb'),
+            archive=bool(retention.get('archive', True)),
+            exclude=self.download_dir,
+            store=self.resume_store,
+            keep_since=self.started_at if self.download_dir == self.download_root else None,
+        )
+        if stats:
+            self.logger.info(
+                f"ダウンロードフォルダを整理しました: 圧縮 {stats['archived']} 件 / 削除 {stats['removed']} 件"
+                f" / レジュメストア {stats['store_removed']} 件"
+            )
+        return stats
 
+    def create_rate_limiter(self) -> Optional[TokenBucket]:
+        settings = self.config.rate_limit or {}
+        if not settings.get('enabled'):
+            return None
+        return TokenBucket(
+            rate=float(settings.get('rate', 1.0)),
+            burst=int(settings.get('burst', 2)),
+            min_rate=float(settings.get('min_rate', 0.1)),
+            slow_threshold=float(settings.get('slow_threshold', 10)),
+            decrease_factor=float(settings.get('decrease_factor', 0.5)),
+            increase_step=float(settings.get('increase_step', 0.05)),
+        )
 
-    def start_webdriver(self) -> webdriver.Edge:
+    def throttle(self, step: str) -> None:
+        if not self.rate_limiter:
+            return
+        waited = self.rate_limiter.acquire(self.pause)
+        if waited > 0:
+            self.logger.debug(f"レート制限により {waited:.2f} 秒待機しました ({step}, {self.rate_limiter.rate:.2f} req/s)")
+
+    def report_response(self, status_code: Optional[int] = None, elapsed: Optional[float] = None) -> None:
+        if self.rate_limiter:
+            self.rate_limiter.record_response(status_code, elapsed)
+
+    def load_retry_policies(self) -> Dict[str, RetryPolicy]:
+        configured = self.config.retry_policies or {}
+        policies: Dict[str, RetryPolicy] = {}
+        for step, defaults in DEFAULT_RETRY_POLICIES.items():
+            policies[step] = RetryPolicy.from_config({**defaults, **(configured.get(step) or {})})
+        return policies
+
+    def with_retry(self, step: str, func: Any, *args: Any, **kwargs: Any) -> Any:
+        return self.retry_policies[step].call(func, *args, logger=self.logger, **kwargs)
+
+    def wait_for_circuit(self) -> None:
+        breaker = self.breaker
+        if breaker.state != "open":
+            return
+        if breaker.trips > breaker.max_trips:
+            raise AutomationError("サイト側の障害が続いているため処理を中断します")
+        cooldown = breaker.cooldown_seconds()
+        self.logger.warning(
+            f"{breaker.consecutive_failures} 件連続で失敗したため {cooldown:.0f} 秒間処理を停止します "
+            f"({breaker.trips}/{breaker.max_trips})"
+        )
+        self.pause(cooldown)
+        breaker.state = "half_open"
+
+    def create_profiler(self, profile_mode: Optional[str]) -> Optional[RunProfiler]:
+        # コマンドライン指定 > config.yaml の profiling 設定
+        settings = self.config.profiling or {}
+        mode = profile_mode or (settings.get('mode', 'cprofile') if settings.get('enabled') else None)
+        if not mode:
+            return None
+        interval = settings.get('interval', 0.01)
+        self.logger.info(f"プロファイリングを有効化します mode={mode}")
+        return RunProfiler(mode, self.run_stem, interval=interval)
+
+    def pause(self, seconds: float) -> None:
+        started = time.perf_counter()
+        try:
+            if self.profiler:
+                with self.profiler.track_wait():
+                    self.cancel_token.wait(seconds)
+            else:
+                self.cancel_token.wait(seconds)
+        finally:
+            self.paused_seconds += time.perf_counter() - started
+
+    @contextmanager
+    def measure_response(self) -> Iterator[None]:
+        """スクリプト側の固定待機（pause）を除いたサイトの応答時間をレート制御へ報告する"""
+        started = time.perf_counter()
+        paused_before = self.paused_seconds
+        try:
+            yield
+        finally:
+            # タイムアウト等で失敗した場合も、待たされた時間として報告してレートを下げる
+            elapsed = time.perf_counter() - started - (self.paused_seconds - paused_before)
+            self.report_response(elapsed=max(elapsed, 0.0))
+
+    def _on_esc(self, _event: Any = None) -> None:
+        if not self.cancel_token.cancelled:
+            self.logger.warning("ESCキー検知：現在のステップ完了後に停止します")
+        self.cancel_token.cancel("ESCキーによる中断")
+
+    def page_load_settings(self) -> Dict[str, Any]:
+        return self.config.page_load or {}
+
+    def start_webdriver(self, tuned: bool = True) -> webdriver.Edge:
+        settings = self.page_load_settings() if tuned else {}
         options = EdgeOptions()
         options.use_chromium = True
         options.add_argument("--start-maximized")
-        download_folder = Path(self.config.download_folder).expanduser().resolve()
+        strategy = settings.get('strategy')
+        if strategy:
+            # eager: DOMContentLoaded で制御を返し、画像等の読み込み完了を待たない
+            options.page_load_strategy = strategy
+        download_folder = self.download_dir
         download_folder.mkdir(parents=True, exist_ok=True)
         prefs = {
             "download.default_directory": str(download_folder),
@@ -190,58 +2094,141 @@ class AutomationScript:
         else:
             driver = webdriver.Edge(options=options)
         driver.set_page_load_timeout(60)
-        try:
-            driver.execute_cdp_cmd(
-                "Page.setDownloadBehavior",
-                {
-                    "behavior": "allow",
-                    "downloadPath": str(download_folder),
-                    "eventsEnabled": True,
-                },
-            )
-        except Exception as exc:
-            self.logger.warning(f"ダウンロード設定の適用に失敗しました: {exc}")
+        self.apply_download_behavior(driver)
+        if settings.get('block_resources'):
+            self.apply_resource_blocking(driver, settings.get('blocked_urls') or DEFAULT_BLOCKED_URLS)
         return driver
 
+    def apply_resource_blocking(self, driver: webdriver.Edge, patterns: List[str]) -> None:
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+            self.logger.info(f"不要リソースのブロックを設定しました: {len(patterns)} パターン")
+        except Exception as exc:
+            self.logger.warning(f"リソースブロックの設定に失敗しました: {exc}")
+
+    def measure_page_load(
+        self, driver: webdriver.Edge, url: str, ready_selector: Optional[str] = None
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        driver.get(url)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        timing = driver.execute_script(PAGE_TIMING_SCRIPT) or {}
+        timing["driver_get_ms"] = round(elapsed_ms, 1)
+        if ready_selector:
+            # 一覧の行など、画面がクライアント側で描画し終わるまでの時間
+            WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.CSS_SELECTOR, ready_selector)))
+            timing["ready_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return timing
+
+    def clear_browser_cache(self, driver: webdriver.Edge) -> None:
+        """2回目以降の計測がHTTPキャッシュから返らないよう、ログイン状態は残してキャッシュだけ消す"""
+        try:
+            driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        except Exception as exc:
+            self.logger.warning(f"ブラウザキャッシュの削除に失敗しました: {exc}")
+
+    def benchmark_targets(self) -> Dict[str, Tuple[str, Optional[str]]]:
+        """ログイン後に応募者一覧を検索し、計測する一覧・詳細画面のURLを取得する"""
+        self.driver.get(self.config.url)
+        self.login()
+        self.navigate_entries()
+        source, _ = self.status_routes()[0]
+        self.filter_entries(source)
+        row_selector = self.list_scan_settings().get('row_selector', "table tbody tr")
+        targets: Dict[str, Tuple[str, Optional[str]]] = {"list": (self.list_url, row_selector)}
+        rows = self.wait_for_list_rows(row_selector, float(self.config.wait_time.get('click', 2)))
+        items = (self.driver.execute_script(LIST_SCAN_SCRIPT, row_selector) or []) if rows else []
+        detail_url = next((item.get("href") for item in items if item.get("href")), "")
+        if detail_url:
+            targets["detail"] = (detail_url, None)
+        else:
+            self.logger.warning("一覧に応募者がいないため、詳細画面は計測しません")
+        return targets
+
+    def benchmark_page_load(self, rounds: int = 3) -> Dict[str, Any]:
+        """既定設定と page_load 設定で、ログイン後の応募者一覧・詳細画面の読み込み時間を比較する"""
+        results: Dict[str, Any] = {"rounds": rounds, "profiles": {}}
+        for label, tuned in (("default", False), ("tuned", True)):
+            self.driver = self.start_webdriver(tuned=tuned)
+            self.browser_wait = CancellableWait(
+                self.driver, self.config.wait_time.get('browser', 6) + 10, self.cancel_token
+            )
+            profile: Dict[str, Any] = {}
+            try:
+                targets = self.benchmark_targets()
+                for page, (url, ready_selector) in targets.items():
+                    samples: List[Dict[str, Any]] = []
+                    for _ in range(rounds):
+                        self.cancel_token.raise_if_cancelled()
+                        self.clear_browser_cache(self.driver)
+                        samples.append(self.measure_page_load(self.driver, url, ready_selector))
+                    summary: Dict[str, Any] = {"url": url, "samples": samples}
+                    for key in (
+                        "driver_get_ms", "ready_ms", "dom_content_loaded_ms", "load_ms",
+                        "transfer_bytes", "resource_count",
+                    ):
+                        values = [v[key] for v in samples if isinstance(v.get(key), (int, float))]
+                        summary[f"avg_{key}"] = round(sum(values) / len(values), 1) if values else None
+                    profile[page] = summary
+                    self.logger.info(
+                        f"[{label}/{page}] driver.get 平均 {summary['avg_driver_get_ms']}ms / "
+                        f"描画完了 平均 {summary['avg_ready_ms']}ms / "
+                        f"転送量 平均 {summary['avg_transfer_bytes']} bytes / リソース数 平均 {summary['avg_resource_count']}"
+                    )
+            finally:
+                self.driver.quit()
+                self.driver = None
+                self.browser_wait = None
+            results["profiles"][label] = profile
+        output = self.run_stem.with_name(f"{self.run_stem.name}_page_load_benchmark.json")
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        self.logger.info(f"ページ読み込みベンチマークを保存しました: {output}")
+        return results
+
+    @timed_stage("login")
     def login(self) -> None:
         if not self.browser_wait:
             raise AutomationError("WebDriverが初期化されていません")
         wait = self.browser_wait
         self.logger.info("ログイン処理を開始します")
         wait.until(EC.element_to_be_clickable((By.XPATH, "//*[@id='__next']/div/main/div[2]/div[2]/a"))).click()
-        time.sleep(self.config.wait_time.get('click', 2))
+        self.pause(self.config.wait_time.get('click', 2))
         user = wait.until(EC.presence_of_element_located((By.ID, "account")))
         user.clear()
         user.send_keys(self.config.username)
-        time.sleep(2)
+        self.pause(2)
         pwd = wait.until(EC.presence_of_element_located((By.ID, "password")))
         pwd.clear()
         pwd.send_keys(self.config.password)
-        time.sleep(2)
+        self.pause(2)
         wait.until(EC.element_to_be_clickable((By.XPATH, "//*[@id='mainContent']/div/div[2]/div[4]/input"))).click()
-        time.sleep(max(2, self.config.wait_time.get('browser', 6)))
+        self.pause(max(2, self.config.wait_time.get('browser', 6)))
 
     def navigate_entries(self) -> None:
         if not self.browser_wait:
             raise AutomationError("WebDriverが初期化されていません")
         self.logger.info("応募者一覧へ遷移します")
-        time.sleep(5)
+        self.pause(5)
         self.browser_wait.until(EC.element_to_be_clickable((By.XPATH, "//*[@id='__next']/header/div/nav/ul/li[3]/a"))).click()
-        time.sleep(self.config.wait_time.get('browser', 4))
+        self.pause(self.config.wait_time.get('browser', 4))
 
     def filter_entries(self, status_value: str = "01") -> None:
         wait = self.browser_wait
         self.logger.info(f"ステータスを{status_value} に設定して検索します")
-        select_element = wait.until(EC.element_to_be_clickable((By.XPATH, "//select[@name='selectionStatus' and @data-select='selectBox']")))
+        select_element = wait.until(EC.element_to_be_clickable((By.XPATH, LIST_STATUS_FILTER_XPATH)))
         Select(select_element).select_by_value(status_value)
         self.click_search()
-        time.sleep(self.config.wait_time.get('browser', 4))
+        self.pause(self.config.wait_time.get('browser', 4))
+        self.list_url = self.driver.current_url
+        self.list_status = status_value
 
     def click_search(self) -> None:
         if not self.browser_wait:
             raise AutomationError("WebDriverが未初期化です")
         self.browser_wait.until(EC.element_to_be_clickable((By.XPATH, "//*[@id='applicationList']/form/div/button"))).click()
-        time.sleep(self.config.wait_time.get('click', 2))
+        self.pause(self.config.wait_time.get('click', 2))
 
     def download_entries(self) -> None:
         if not self.browser_wait:
@@ -251,12 +2238,15 @@ class AutomationScript:
             EC.presence_of_element_located((By.XPATH, "//button[@data-la='entries_download_btn_click']"))
         )
         self.driver.execute_script("arguments[0].click();", download_button)
-        time.sleep(self.config.wait_time.get('browser', 6))
+        self.pause(self.config.wait_time.get('browser', 6))
 
-    def get_latest_csv(self) -> str:
-        folder = Path(self.config.download_folder).expanduser().resolve()
+    def get_latest_csv(self, since: Optional[float] = None) -> str:
+        folder = self.download_dir
         self.logger.info(f"ダウンロードフォルダからCSVを探します: {folder}")
         csv_files = list(folder.glob("*.csv"))
+        if since is not None:
+            # 直前のダウンロードで作成されたCSVのみを対象にする
+            csv_files = [f for f in csv_files if max(f.stat().st_ctime, f.stat().st_mtime) >= since]
         if not csv_files:
             raise AutomationError("CSVファイルが見つかりません")
         latest = max(csv_files, key=lambda f: f.stat().st_ctime)
@@ -265,12 +2255,84 @@ class AutomationScript:
 
     def process_data(self, csv_path: str) -> pd.DataFrame:
         self.logger.info(f"CSVを読み込みます: {csv_path}")
-        df = pd.read_csv(csv_path)
-        df = df.iloc[:, [1, 4, 8, 29, 36]]
+        raw = pd.read_csv(csv_path)
+        df = raw.iloc[:, [1, 4, 8, 29, 36]]
         df.columns = ["B", "E", "I", "AD", "AK"]
         df["AD"] = df["AD"].apply(self.clean_branch_name)
+        if self.list_scan_enabled():
+            # 一覧直接遷移モードでは応募者IDで照合する
+            id_column = int(self.list_scan_settings().get('id_column', 0))
+            df["ID"] = raw.iloc[:, id_column].astype(str).str.strip()
         return df
 
+    def wait_for_list_rows(self, row_selector: str, settle: float) -> List[Any]:
+        """一覧の行を待つ。ページ読み込み完了後 settle 秒たっても行がなければ0件として空リストを返す"""
+        started = time.monotonic()
+
+        def rows_or_empty(driver: Any) -> Any:
+            rows = driver.find_elements(By.CSS_SELECTOR, row_selector)
+            if rows:
+                return (rows,)
+            loaded = driver.execute_script("return document.readyState;") == "complete"
+            if loaded and time.monotonic() - started >= settle:
+                return ([],)
+            return False
+
+        return self.browser_wait.until(rows_or_empty)[0]
+
+    def list_scan_settings(self) -> Dict[str, Any]:
+        return self.config.list_scan or {}
+
+    def list_scan_enabled(self) -> bool:
+        return bool(self.list_scan_settings().get('enabled'))
+
+    def scan_entry_list(self) -> Dict[str, ListEntry]:
+        if not self.browser_wait or not self.driver:
+            raise AutomationError("WebDriverが初期化されていません")
+        settings = self.list_scan_settings()
+        row_selector = settings.get('row_selector', "table tbody tr")
+        next_xpath = settings.get('next_page_xpath', "//button[@data-la='entries_pager_next_btn_click']")
+        max_pages = int(settings.get('max_pages', 50))
+        self.logger.info("応募者一覧から応募者IDと詳細リンクを取得します")
+        entries: Dict[str, ListEntry] = {}
+        settle = float(self.config.wait_time.get('click', 2))
+        for page in range(1, max_pages + 1):
+            self.cancel_token.raise_if_cancelled()
+            rows = self.wait_for_list_rows(row_selector, settle)
+            if not rows:
+                # 該当ステータスの応募者が0件の場合は行が描画されない
+                self.logger.info("一覧に応募者がいません")
+                break
+            items = self.driver.execute_script(LIST_SCAN_SCRIPT, row_selector) or []
+            for item in items:
+                applicant_id = str(item.get("id") or "").strip()
+                href = item.get("href") or ""
+                if applicant_id and href and applicant_id not in entries:
+                    entries[applicant_id] = ListEntry(applicant_id, href, item.get("text") or "")
+            next_buttons = self.driver.find_elements(By.XPATH, next_xpath)
+            if not next_buttons:
+                break
+            next_button = next_buttons[0]
+            if next_button.get_attribute("disabled") or next_button.get_attribute("aria-disabled") == "true":
+                break
+            self.driver.execute_script("arguments[0].click();", next_button)
+            # 前ページの行が差し替わる（または同じ要素のまま内容が書き換わる）まで待つ
+            previous = [item.get("id") or item.get("href") for item in items]
+            first_row_stale = EC.staleness_of(rows[0])
+
+            def page_changed(driver: Any) -> bool:
+                if first_row_stale(driver):
+                    return True
+                items_now = driver.execute_script(LIST_SCAN_SCRIPT, row_selector) or []
+                current = [i.get("id") or i.get("href") for i in items_now]
+                return bool(current) and current != previous
+
+            self.browser_wait.until(page_changed)
+            self.pause(self.config.wait_time.get('click', 2))
+            self.logger.info(f"一覧 {page + 1} ページ目を取得します")
+        self.logger.info(f"一覧から {len(entries)} 件の応募者を取得しました")
+        return entries
+
     def clean_branch_name(self, text: Any) -> str:
         if not isinstance(text, str):
             return ""
@@ -278,19 +2340,92 @@ class AutomationScript:
         cleaned = parts[-1] if len(parts) > 1 else text
         return cleaned.strip()
 
-    def build_record_file_stem(self, row: pd.Series) -> str:
-        def normalize(value: Any) -> str:
-            if isinstance(value, str):
-                return value.strip()
-            if pd.isna(value):
-                return ""
-            return str(value).strip()
-
-        parts: List[str] = []
-        for key in ("B", "AD", "AK"):
-            part = normalize(row.get(key))
-            if part:
-                parts.append(part)
+    def build_applicant_records(self, df: pd.DataFrame) -> List[ApplicantRecord]:
+        """列単位で正規化してから1回のループで応募者レコードを生成する"""
+        if df.empty:
+            return []
+        columns = {col: [normalize_cell(v) for v in df[col].tolist()] for col in ("B", "I", "AD", "AK")}
+        ages = df["E"].tolist()
+        ids = [normalize_cell(v) for v in df["ID"].tolist()] if "ID" in df.columns else [""] * len(df)
+        keys = [normalize_cell(v) for v in df["key"].tolist()] if "key" in df.columns else [""] * len(df)
+        targets = df["target_status"].tolist() if "target_status" in df.columns else ["04"] * len(df)
+        skips = df["skip"].tolist() if "skip" in df.columns else [""] * len(df)
+        sources = df["source_status"].tolist() if "source_status" in df.columns else [""] * len(df)
+        records: List[ApplicantRecord] = []
+        for name, age, email, branch, job_type, applicant_id, key, target, skip, source in zip(
+            columns["B"], ages, columns["I"], columns["AD"], columns["AK"], ids, keys, targets, skips, sources
+        ):
+            stem = self.build_record_file_stem(name, branch, job_type)
+            records.append(
+                ApplicantRecord(
+                    name, age, email, branch, job_type, stem, applicant_id, key, target, skip, str(source)
+                )
+            )
+        return records
+
+    def eligibility_masks(self, df: pd.DataFrame) -> List[Tuple[str, pd.Series]]:
+        """config.yaml の eligibility を「対象外にする行」のマスク（列単位の演算）に変換する"""
+        # 条件ごとに既定値へ重ねる（age を無効にするには null / {} を明示する）
+        rules = {**DEFAULT_ELIGIBILITY, **(self.config.eligibility or {})}
+        masks: List[Tuple[str, pd.Series]] = []
+        age_rule = rules.get('age') or {}
+        if age_rule:
+            ages = pd.to_numeric(df["E"], errors="coerce")
+            invalid = ages.isna()
+            out_of_range = pd.Series(False, index=df.index)
+            if age_rule.get('min') is not None:
+                out_of_range |= ages < float(age_rule['min'])
+            if age_rule.get('max') is not None:
+                out_of_range |= ages > float(age_rule['max'])
+            masks.append(("age", out_of_range & ~invalid))
+            if age_rule.get('invalid', 'process') == 'skip':
+                masks.append(("invalid_age", invalid))
+        branch_rule = rules.get('branches') or {}
+        if branch_rule.get('allow') or branch_rule.get('deny'):
+            # 東京本店/東京支店を区別できるよう、末尾の「支店」等は残したまま比較する
+            branches = df["AD"].map(lambda v: normalize_branch_key(v, strip_suffix=False))
+        if branch_rule.get('allow'):
+            allowed = {
+                normalize_branch_key(self.clean_branch_name(str(b)), strip_suffix=False) for b in branch_rule['allow']
+            }
+            masks.append(("branch", ~branches.isin(allowed)))
+        if branch_rule.get('deny'):
+            denied = {
+                normalize_branch_key(self.clean_branch_name(str(b)), strip_suffix=False) for b in branch_rule['deny']
+            }
+            masks.append(("branch", branches.isin(denied)))
+        job_rule = rules.get('job_types') or {}
+        job_types = df["AK"].fillna("").astype(str)
+        # 職種は部分一致で判定する
+        if job_rule.get('allow'):
+            pattern = "|".join(re.escape(str(v)) for v in job_rule['allow'])
+            masks.append(("job_type", ~job_types.str.contains(pattern, regex=True)))
+        if job_rule.get('deny'):
+            pattern = "|".join(re.escape(str(v)) for v in job_rule['deny'])
+            masks.append(("job_type", job_types.str.contains(pattern, regex=True)))
+        dedup_columns = [c for c in rules.get('dedup') or [] if c in df.columns]
+        if dedup_columns:
+            masks.append(("duplicate", df.duplicated(subset=dedup_columns, keep="first")))
+        return masks
+
+    def apply_eligibility(self, df: pd.DataFrame) -> pd.DataFrame:
+        """対象外の応募者に最初に該当した条件名を skip 列へ設定し、条件ごとの件数をログに出す"""
+        df = df.copy()
+        df["skip"] = ""
+        if df.empty:
+            return df
+        counts: Counter = Counter()
+        for rule, mask in self.eligibility_masks(df):
+            newly = mask & (df["skip"] == "")
+            df.loc[newly, "skip"] = rule
+            counts[rule] += int(newly.sum())
+        if counts:
+            summary = " / ".join(f"{ELIGIBILITY_RULE_LABELS.get(r, r)} {n} 件" for r, n in counts.items())
+            self.logger.info(f"対象外の応募者: {summary}（対象 {int((df['skip'] == '').sum())} 件）")
+        return df
+
+    def build_record_file_stem(self, *values: str) -> str:
+        parts = [v for v in values if v]
         combined = "_".join(parts)
         safe_stem = "".join(c for c in combined if c.isalnum() or c in ("_", "-", " "))
         safe_stem = safe_stem.strip()
@@ -347,6 +2482,27 @@ class AutomationScript:
         )
         contact_df["branch_norm"] = contact_df["branch"].apply(self.clean_branch_name)
         self.contact_df = contact_df
+        # 支店名 → 送信先を一度だけ構築し、応募者ごとの検索は索引の参照で済ませる
+        settings = self.config.branch_matching or {}
+        self.branch_index = BranchIndex(min_score=BRANCH_SUGGEST_SCORE, ngram=int(settings.get('ngram', 2)))
+        # 梅田南店/梅田北店のような別支店も類似度が高くなるため、あいまい一致での送信は明示的に有効にした場合のみ
+        self.branch_fuzzy_min_score: Optional[float] = (
+            float(settings.get('min_score', 0.9)) if settings.get('fuzzy', False) else None
+        )
+        for branch, norm, person, to_addr, cc_addr in zip(
+            contact_df["branch"].tolist(),
+            contact_df["branch_norm"].tolist(),
+            contact_df.get("person", pd.Series([""] * len(contact_df))).tolist(),
+            contact_df.get("to", pd.Series([""] * len(contact_df))).tolist(),
+            contact_df.get("cc", pd.Series([""] * len(contact_df))).tolist(),
+        ):
+            contact = ContactRecord(
+                normalize_cell(branch), normalize_cell(person), normalize_cell(to_addr), normalize_cell(cc_addr)
+            )
+            self.branch_index.add(norm, contact)
+        for conflict in self.branch_index.conflicts:
+            self.logger.warning(f"支店名の重複: {conflict}")
+        self.logger.info(f"支店索引を作成しました: {len(self.branch_index)} 件")
 
         body_sheet_name = self.config.body_sheet_name
         if body_sheet_name and body_sheet_name not in sheet_names:
@@ -359,26 +2515,43 @@ class AutomationScript:
             template_sheet = sheets[1] if len(sheets) > 1 else sheets[0]
 
         try:
-            self.mail_subject_template = (template_sheet["B1"].value or "").strip()
+            subject = str(template_sheet["B1"].value or "").strip()
             raw_body = template_sheet["B2"].value or ""
-            self.mail_body_template = str(raw_body).replace("%0a", "\n").strip()
+            body = str(raw_body).replace("%0a", "\n").strip()
         except Exception as exc:
             raise AutomationError(f"メール本文テンプレートの読み込みに失敗しました: {exc}")
+        # 差し込み項目の誤りは応募者の処理を始める前に検出する
+        self.mail_subject = MailTemplate(subject, source="件名（B1）")
+        self.mail_body = MailTemplate(body, source="本文（B2）")
 
-    def find_contact_by_branch(self, branch_name: str) -> Optional[pd.Series]:
-        if not hasattr(self, "contact_df"):
+    def find_contact_by_branch(self, branch_name: str) -> Optional[ContactRecord]:
+        if not hasattr(self, "branch_index"):
             return None
         target = self.clean_branch_name(branch_name)
         if not target:
             return None
-        df = self.contact_df
-        matches = df[df["branch_norm"] == target]
-        if matches.empty:
+        cached = target in self.branch_index.cache
+        match = self.branch_index.match(target)
+        if match is None:
             return None
-        return matches.iloc[0]
+        if match.method == "fuzzy":
+            accepted = self.branch_fuzzy_min_score is not None and match.score >= self.branch_fuzzy_min_score
+            if not accepted:
+                if not cached:
+                    self.logger.warning(
+                        f"支店名が一致しないため送信しません: {target}（候補: {match.contact.branch} 類似度 {match.score:.2f}）"
+                    )
+                self.report.events["branch_fuzzy_suggestion"] += 1
+                return None
+            if not cached:
+                self.logger.warning(
+                    f"支店名をあいまい一致で照合しました: {target} → {match.contact.branch} (類似度 {match.score:.2f})"
+                )
+            self.report.events["branch_fuzzy_match"] += 1
+        return match.contact
 
     def build_attachments(self, stem: str, allow_png_only: bool = False) -> List[Path]:
-        folder = Path(self.config.download_folder).expanduser().resolve()
+        folder = self.download_dir
         pdf_candidates = list(folder.glob(f"{stem}*.pdf"))
         attachments: List[Path] = []
         if pdf_candidates:
@@ -408,36 +2581,126 @@ class AutomationScript:
         root.destroy()
         return result
 
-    def search_and_open(self, full_name: str) -> Optional[str]:
+    @timed_stage("search")
+    def prepare_search(self, status_value: str) -> None:
+        """検索前に、一覧の選考ステータスの絞り込みを応募者の取得元ステータスに合わせる"""
+        if not self.driver.find_elements(By.NAME, "searchWord"):
+            # 詳細画面へ直接遷移した後のタブには検索ボックスがないため一覧に戻る
+            self.logger.info("検索のため応募者一覧に戻ります")
+            if self.list_url:
+                self.driver.get(self.list_url)
+            else:
+                self.navigate_entries()
+            self.browser_wait.until(EC.presence_of_element_located((By.NAME, "searchWord")))
+        if not status_value:
+            return
+        selects = self.driver.find_elements(By.XPATH, LIST_STATUS_FILTER_XPATH)
+        current = Select(selects[0]).first_selected_option.get_attribute("value") if selects else None
+        if current != status_value:
+            self.filter_entries(status_value)
+
+    def search_and_open(self, full_name: str, status_value: str = "") -> Optional[str]:
         if not self.browser_wait or not self.driver:
             raise AutomationError("WebDriverが初期化されていません")
+        set_log_context(step="search")
+        self.prepare_search(status_value)
+        self.throttle("search")
+        with self.measure_response():
+            return self._search_and_open(full_name)
+
+    def _search_and_open(self, full_name: str) -> Optional[str]:
         self.logger.info(f"応募者を検索します: {full_name}")
         search_box = self.browser_wait.until(EC.presence_of_element_located((By.NAME, "searchWord")))
         search_box.clear()
         search_box.send_keys(full_name)
-        time.sleep(2)
+        self.pause(2)
         self.click_search()
         rows = self.browser_wait.until(EC.presence_of_all_elements_located((By.XPATH, "//td[contains(@class, 'styles_tdSelectionStatus')]")))
         if not rows:
             raise AutomationError("検索結果が見つかりません")
         self.logger.info("対応状況セルを開いて詳細画面へ遷移します")
-        time.sleep(2)
+        self.pause(2)
         try:
             first_row = self.browser_wait.until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, "table tbody tr:first-child"))
             )
             first_row.click()
             self.logger.info("最初の行全体をクリックしました")
-            time.sleep(2)
+            self.pause(2)
         except Exception:
-            time.sleep(2)
+            self.pause(2)
             self.logger.warning("行全体のクリックに失敗したため、セルを再試行します")
-            time.sleep(2)
+            self.pause(2)
             first_cell = self.browser_wait.until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, "table tbody tr:first-child td:first-child"))
             )
             first_cell.click()
             self.logger.info("セルをクリックして詳細を開きました")
+        return self.get_resume_url()
+
+    @timed_stage("detail")
+    def open_detail_directly(self, entry: ListEntry) -> Optional[str]:
+        if not self.browser_wait or not self.driver:
+            raise AutomationError("WebDriverが初期化されていません")
+        set_log_context(step="detail")
+        self.throttle("detail")
+        self.logger.info(f"応募者ID {entry.applicant_id} の詳細画面へ直接遷移します")
+        with self.measure_response():
+            self.driver.get(entry.detail_url)
+            return self.get_resume_url()
+
+    def instrument_command_counter(self, driver: Any) -> None:
+        # 応募者ごとのWebDriverコマンド数（HTTP往復回数）を集計する
+        original_execute = driver.execute
+
+        def execute(driver_command: str, params: Optional[Dict[str, Any]] = None) -> Any:
+            self.webdriver_commands += 1
+            return original_execute(driver_command, params)
+
+        driver.execute = execute
+
+    def extract_detail(self) -> Dict[str, Any]:
+        if not self.browser_wait or not self.driver:
+            raise AutomationError("WebDriverが初期化されていません")
+
+        content_seen: List[float] = []
+
+        def payload_when_ready(driver: Any) -> Any:
+            payload = driver.execute_script(
+                DETAIL_EXTRACT_SCRIPT, RESUME_LINK_SELECTOR, OVERLAY_CLOSE_SELECTOR, STATUS_SELECT_XPATH
+            )
+            if not payload:
+                return False
+            if payload.get("resume_href"):
+                return payload
+            # オーバーレイの枠（閉じるボタン）は本文より先に描画されるため、取得完了の判定には使わない。
+            # 本文（項目またはステータス選択）が表示されてもレジュメリンクがない場合は、
+            # 少し待ってからレジュメなしと判断する
+            if not (payload.get("fields") or payload.get("status")):
+                return False
+            if not content_seen:
+                content_seen.append(time.monotonic())
+            if time.monotonic() - content_seen[0] >= DETAIL_RESUME_GRACE_SECONDS:
+                return payload
+            return False
+
+        self.detail_payload = self.browser_wait.until(payload_when_ready)
+        return self.detail_payload
+
+    def get_resume_url(self) -> Optional[str]:
+        self.detail_payload = None
+        if self.config.dom_extraction:
+            try:
+                payload = self.extract_detail()
+            except Exception as exc:
+                self.logger.warning(f"詳細画面の情報取得に失敗したためスクリーンショットに切り替えます: {exc}")
+                return None
+            pdf_url = payload.get("resume_href") or ""
+            if not pdf_url:
+                self.logger.warning("レジュメボタンが見つからないためスクリーンショットに切り替えます")
+                return None
+            self.logger.info(f"レジュメPDFのURL: {pdf_url[:80]}...")
+            return pdf_url
         try:
             resume_button = self.browser_wait.until(
                 EC.presence_of_element_located((By.XPATH, "//a[@data-la='entry_detail_resume_btn_click']"))
@@ -445,22 +2708,24 @@ class AutomationScript:
             pdf_url = resume_button.get_attribute("href")
             if not pdf_url:
                 raise AutomationError("レジュメのPDF URLを取得できませんでした")
-            time.sleep(2)
+            self.pause(2)
             self.logger.info(f"レジュメPDFのURL: {pdf_url[:80]}...")
-            time.sleep(2)
+            self.pause(2)
             return pdf_url
         except Exception as exc:
             self.logger.warning(f"レジュメボタンが見つからないためスクリーンショットに切り替えます: {exc}")
-            time.sleep(2)
+            self.pause(2)
             return None
 
+    @timed_stage("download")
     def download_pdf_from_url(self, pdf_url: str, file_name: str) -> Path:
         if not self.driver:
             raise AutomationError("WebDriverが未初期化です")
-        download_folder = Path(self.config.download_folder).expanduser().resolve()
+        download_folder = self.download_dir
         download_folder.mkdir(parents=True, exist_ok=True)
         safe_stem = "".join(c for c in file_name if c.isalnum() or c in ("_", "-", " ")).strip() or "resume"
         target_name = f"{safe_stem}.pdf"
+        set_log_context(step="download")
         self.logger.info(f"PDFダウンロードを開始します url={pdf_url[:80]}...")
         origin_handle = None
         new_window_created = False
@@ -474,8 +2739,11 @@ class AutomationScript:
             self.logger.debug("PDFダウンロード用の新規タブを開きました")
         except Exception as exc:
             self.logger.warning(f"新規タブの作成に失敗したため既存タブを使用します: {exc}")
+        # ブラウザでのPDF表示もAirワークからPDF全体を取得するため、レート制限の対象にする
+        self.throttle("download")
         try:
-            self.driver.get(pdf_url)
+            with self.measure_response():
+                self.driver.get(pdf_url)
         except Exception as exc:
             self.logger.warning(f"PDFビューア表示に失敗しましたがダウンロードは継続します: {exc}")
 
@@ -493,16 +2761,57 @@ class AutomationScript:
 
         target_path = download_folder / target_name
         try:
-            with requests.get(pdf_url, headers=headers, cookies=cookies, stream=True, timeout=60) as resp:
+            self.with_retry("download", self.fetch_pdf, pdf_url, target_path, headers, cookies)
+            self.logger.info(f"PDFを保存しました: {target_path}")
+        except Exception as exc:
+            raise AutomationError(f"PDFダウンロードに失敗しました: {exc}")
+        finally:
+            self.close_download_tab(new_window_created, origin_handle)
+        return target_path
+
+    def fetch_pdf(self, pdf_url: str, target_path: Path, headers: Dict[str, str], cookies: Dict[str, str]) -> None:
+        # 書きかけのPDFが残らないよう一時ファイルへ保存してから置き換える
+        part_path = target_path.with_name(f"{target_path.name}.part")
+        store = self.resume_store
+        stem = target_path.stem
+        if store is not None:
+            headers = {**headers, **store.conditional_headers(stem)}
+        self.throttle("download")
+        started = time.perf_counter()
+        try:
+            try:
+                resp = requests.get(pdf_url, headers=headers, cookies=cookies, stream=True, timeout=60)
+            except requests.RequestException:
+                self.report_response(elapsed=time.perf_counter() - started)
+                raise
+            with resp:
+                self.report_response(resp.status_code, resp.elapsed.total_seconds())
+                if store is not None and store.is_current(stem, resp):
+                    # 保存済みのPDFが最新なら本文を読まずに再利用する
+                    self.logger.info(f"保存済みのレジュメを再利用します: {stem}")
+                    self.report.events["resume_reused"] += 1
+                    store.materialize(stem, target_path)
+                    return
                 resp.raise_for_status()
-                with open(target_path, "wb") as f:
+                digest = hashlib.sha256()
+                size = 0
+                with open(part_path, "wb") as f:
                     for chunk in resp.iter_content(chunk_size=8192):
+                        self.cancel_token.raise_if_cancelled()
                         if chunk:
                             f.write(chunk)
-            self.logger.info(f"PDFを保存しました: {target_path}")
-        except Exception as exc:
-            raise AutomationError(f"PDFダウンロードに失敗しました: {exc}")
+                            digest.update(chunk)
+                            size += len(chunk)
+                if store is not None:
+                    store.put(stem, part_path, digest.hexdigest(), size, resp)
+                    store.materialize(stem, target_path)
+                    return
+            os.replace(part_path, target_path)
+        finally:
+            if part_path.exists():
+                part_path.unlink()
 
+    def close_download_tab(self, new_window_created: bool, origin_handle: Optional[str]) -> None:
         if new_window_created:
             try:
                 self.driver.close()
@@ -518,89 +2827,228 @@ class AutomationScript:
         else:
             try:
                 self.driver.back()
-                time.sleep(1)
+                self.pause(1)
             except Exception as exc:
                 self.logger.warning(f"前の画面への戻りに失敗しました: {exc}")
-        return target_path
 
+    @timed_stage("screenshot")
     def capture_screenshot(self, stem: str) -> Path:
-        folder = Path(self.config.download_folder).expanduser().resolve()
+        folder = self.download_dir
         folder.mkdir(parents=True, exist_ok=True)
         safe_stem = "".join(c for c in stem if c.isalnum() or c in ("_", "-", " ")).strip() or "screenshot"
         target_path = folder / f"{safe_stem}.png"
-        img = pyautogui.screenshot()
-        img.save(str(target_path))
+        set_log_context(step="screenshot")
+        if self.config.screenshot_source == 'browser' and self.driver:
+            # 複数アカウント同時実行時はデスクトップ全体ではなく自分のブラウザのみを撮影する
+            if not self.driver.save_screenshot(str(target_path)):
+                raise AutomationError("ブラウザのスクリーンショット保存に失敗しました")
+        else:
+            img = pyautogui.screenshot()
+            img.save(str(target_path))
         self.logger.info(f"スクリーンショットを保存しました: {target_path}")
         return target_path
 
-    def send_email(self, contact: pd.Series, attachments: List[Path], applicant_email: str = "") -> None:
-        if win32com is None:
-            raise AutomationError("win32com がインポートできません")
+    def attachment_settings(self) -> Dict[str, Any]:
+        return self.config.attachments or {}
 
-        # To/CC/担当者の値を NaN や空白に対応しつつ安全に取得
-        to_raw = contact.get("to", "")
-        cc_raw = contact.get("cc", "")
-        person_raw = contact.get("person", "")
+    def attachment_budget(self) -> int:
+        max_mb = self.attachment_settings().get('max_message_mb')
+        return int(float(max_mb) * 1024 * 1024) if max_mb else 0
 
-        to_addr = ""
-        if pd.notna(to_raw):
-            to_addr = str(to_raw).strip()
+    def screenshot_crop_box(self) -> Optional[Tuple[int, int, int, int]]:
+        """切り抜き範囲（crop: browser ならブラウザウィンドウ、[左, 上, 右, 下] なら指定範囲）"""
+        crop = self.attachment_settings().get('crop')
+        if isinstance(crop, (list, tuple)) and len(crop) == 4:
+            return tuple(int(v) for v in crop)
+        if crop == 'browser' and self.config.screenshot_source != 'browser' and self.driver:
+            try:
+                rect = self.driver.get_window_rect()
+            except WebDriverException as exc:
+                self.logger.debug(f"ウィンドウ位置の取得に失敗しました: {exc}")
+                return None
+            return (rect['x'], rect['y'], rect['x'] + rect['width'], rect['y'] + rect['height'])
+        return None
+
+    def submit_attachment_optimization(self, path: Path) -> None:
+        """スクリーンショットの圧縮を別スレッドで開始し、その間にブラウザ操作を続ける"""
+        settings = self.attachment_settings()
+        if not settings.get('optimize') or Image is None:
+            return
+        fmt = settings.get('format', 'jpeg')
+        if fmt not in ATTACHMENT_FORMATS:
+            self.logger.warning(f"未対応の添付形式のため圧縮しません: {fmt}")
+            return
+        if self.attachment_executor is None:
+            self.attachment_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="attachment")
+        self.pending_attachments[path] = self.attachment_executor.submit(
+            optimize_image,
+            path,
+            fmt,
+            int(settings.get('quality', 70)),
+            settings.get('max_width'),
+            self.screenshot_crop_box(),
+            self.attachment_budget() or None,
+        )
 
-        cc_addr = ""
-        if pd.notna(cc_raw):
-            cc_addr = str(cc_raw).strip()
+    def resolve_attachments(self, attachments: List[Path]) -> List[Path]:
+        """圧縮の完了を待って添付ファイルを差し替え、1通あたりのサイズ上限に収める"""
+        resolved: List[Path] = []
+        for path in attachments:
+            future = self.pending_attachments.pop(path, None)
+            if future is not None:
+                try:
+                    optimized = future.result()
+                    self.logger.info(
+                        f"添付ファイルを圧縮しました: {optimized.name} ({optimized.stat().st_size / 1024:.0f}KB)"
+                    )
+                    path = optimized
+                except Exception as exc:
+                    self.logger.warning(f"添付ファイルの圧縮に失敗したため元のファイルを添付します: {exc}")
+            resolved.append(path)
+        budget = self.attachment_budget()
+        total = sum(p.stat().st_size for p in resolved if p.exists())
+        if not budget or total <= budget:
+            return resolved
+        images = [p for p in resolved if p.suffix.lower() in IMAGE_FORMATS_BY_SUFFIX]
+        if images and Image is not None:
+            others = total - sum(p.stat().st_size for p in images)
+            share = max((budget - others) // len(images), 1)
+            quality = int(self.attachment_settings().get('quality', 70))
+            try:
+                resolved = [
+                    optimize_image(p, IMAGE_FORMATS_BY_SUFFIX[p.suffix.lower()], quality, max_bytes=share)
+                    if p in images else p
+                    for p in resolved
+                ]
+            except Exception as exc:
+                self.logger.warning(f"添付画像の縮小に失敗しました: {exc}")
+            total = sum(p.stat().st_size for p in resolved if p.exists())
+        if total > budget:
+            self.logger.warning(f"添付ファイルの合計 {total / 1024 / 1024:.1f}MB が上限を超えています")
+        return resolved
+
+    def mail_fields(
+        self,
+        contact: ContactRecord,
+        records: List[ApplicantRecord],
+        applicant_email: str,
+        summary_lines: Optional[List[str]],
+    ) -> Dict[str, str]:
+        """差し込み項目の値（まとめ送信では氏名・職種を列挙する）"""
+        names = [r.B for r in records if r.B]
+        job_types = list(dict.fromkeys(r.AK for r in records if r.AK))
+        return {
+            "name": "、".join(names),
+            "age": format_age(records[0].E) if len(records) == 1 else "",
+            "job_type": "、".join(job_types),
+            "branch": contact.branch,
+            "email": applicant_email,
+            "person": contact.person,
+            "count": str(len(records)),
+            "applicants": "\n".join(summary_lines or []),
+        }
 
-        person = ""
-        if pd.notna(person_raw):
-            person = str(person_raw).strip()
+    @timed_stage("mail")
+    def send_email(
+        self,
+        contact: ContactRecord,
+        attachments: List[Path],
+        applicant_email: str = "",
+        summary_lines: Optional[List[str]] = None,
+        records: Optional[List[ApplicantRecord]] = None,
+    ) -> None:
+        if win32com is None:
+            raise MailSendError("win32com がインポートできません")
+
+        # To/CC/担当者は ContactRecord 生成時に NaN・空白を正規化済み
+        to_addr = contact.to
+        cc_addr = contact.cc
+        person = contact.person
 
-        subject = (getattr(self, "mail_subject_template", "") or "").strip()
-        body_template = getattr(self, "mail_body_template", "") or ""
-        greeting = f"{person} さん" if person else ""
+        values = self.mail_fields(contact, records or [], applicant_email, summary_lines)
+        subject = self.mail_subject.render(values).strip()
+        body_template = self.mail_body
 
+        # テンプレート側で差し込んでいない項目のみ従来どおり本文の先頭に付け加える
         body_parts: List[str] = []
-        if greeting:
-            body_parts.append(greeting)
-        if applicant_email:
+        if person and "person" not in body_template.fields:
+            body_parts.append(f"{person} さん")
+        if applicant_email and "email" not in body_template.fields:
             body_parts.append(f"応募者メール: {applicant_email}")
+        if summary_lines and "applicants" not in body_template.fields:
+            body_parts.append(f"応募者 {len(summary_lines)} 名分をまとめて送付します。\n" + "\n".join(summary_lines))
         if body_template:
-            body_parts.append(body_template)
-        body = "\n\n".join(body_parts) if body_parts else body_template
+            body_parts.append(body_template.render(values))
+        body = "\n\n".join(body_parts)
 
+        self.cancel_token.raise_if_cancelled()
+        set_log_context(step="mail")
         self.logger.info(f"メールを生成します To={to_addr} Cc={cc_addr} 件名={subject}")
-        mail = win32com.client.Dispatch("Outlook.Application").CreateItem(0)
-        mail.To = to_addr
-        if cc_addr:
-            mail.CC = cc_addr
-        mail.Subject = subject
-        mail.Body = body
-        for attachment in attachments:
-            mail.Attachments.Add(str(attachment))
-        mail.Send()
+        try:
+            mail = win32com.client.Dispatch("Outlook.Application").CreateItem(0)
+            mail.To = to_addr
+            if cc_addr:
+                mail.CC = cc_addr
+            mail.Subject = subject
+            mail.Body = body
+            for attachment in attachments:
+                mail.Attachments.Add(str(attachment))
+            mail.Send()
+        except Exception as exc:
+            raise MailSendError(f"Outlookでのメール送信に失敗しました: {exc}") from exc
         self.logger.info("メール送信が完了しました")
 
+    @timed_stage("close_overlay")
     def close_overlay(self) -> None:
         if not self.browser_wait:
             return
+        payload = self.detail_payload
+        self.detail_payload = None
+        if self.config.dom_extraction:
+            if payload is not None and not payload.get("overlay_present"):
+                return
+            # 待機とクリックを1回のスクリプト実行で済ませる
+            try:
+                clicked = self.driver.execute_script(
+                    "const b = document.querySelector(arguments[0]); if (b) { b.click(); return true; } return false;",
+                    OVERLAY_CLOSE_SELECTOR,
+                )
+                if clicked:
+                    self.pause(1)
+            except Exception:
+                pass
+            return
         try:
             btn = self.browser_wait.until(EC.element_to_be_clickable((By.XPATH, "//img[@data-la='overlay_entry_detail_close_btn_click']")))
             btn.click()
-            time.sleep(1)
+            self.pause(1)
         except Exception:
             pass
 
-    def update_application_status(self, status_value: str = "04") -> None:
+    @timed_stage("status_update")
+    def update_application_status(self, status_value: str = "04", select_xpath: Optional[str] = None) -> None:
         if not self.browser_wait:
-            return
-        try:
+            raise AutomationError("WebDriverが未初期化です")
+        xpath = select_xpath or STATUS_SELECT_XPATH
+        set_log_context(step="status_update")
+
+        def select_status() -> None:
+            self.throttle("status_update")
+            started = time.perf_counter()
             select_elem = self.browser_wait.until(
-                EC.element_to_be_clickable((By.XPATH, "(//select[@data-select='selectBoxTable'])[1]"))
+                EC.element_to_be_clickable((By.XPATH, xpath))
             )
             Select(select_elem).select_by_value(status_value)
-            time.sleep(self.config.wait_time.get('click', 2))
-            self.logger.info(f"ステータスを {status_value} に更新しました")
-        except Exception as exc:
+            self.report_response(elapsed=time.perf_counter() - started)
+
+        try:
+            self.with_retry("status_update", select_status)
+        except APPLICANT_ERRORS as exc:
+            # 呼び出し元でステータス未更新（status_pending）として記録させる
             self.logger.warning(f"ステータス更新に失敗しました: {exc}")
+            raise
+        self.pause(self.config.wait_time.get('click', 2))
+        self.logger.info(f"ステータスを {status_value} に更新しました")
 
     def show_dialog(self, message: str, is_error: bool = False) -> None:
         root = tk.Tk()
@@ -611,88 +3059,200 @@ class AutomationScript:
             messagebox.showinfo("通知", message)
         root.destroy()
 
+    def save_report(self) -> None:
+        try:
+            for path in self.report.save(self.run_stem):
+                self.logger.info(f"実行レポートを保存しました: {path}")
+        except Exception as exc:
+            self.logger.warning(f"実行レポートの保存に失敗しました: {exc}")
+
+    def save_profile(self) -> None:
+        if not self.profiler:
+            return
+        self.profiler.stop()
+        try:
+            for path in self.profiler.save():
+                self.logger.info(f"プロファイル結果を保存しました: {path}")
+            summary = self.profiler.summary()
+            self.logger.info(
+                f"実行時間 {summary['wall_seconds']}s (待機 {summary['wait_seconds']}s / "
+                f"処理 {summary['compute_seconds']}s) WebDriverコマンド {summary['webdriver_command_total']} 回"
+            )
+        except Exception as exc:
+            self.logger.warning(f"プロファイル結果の保存に失敗しました: {exc}")
+
     def cleanup(self, close_browser: bool = True) -> None:
-        self.running = False
+        if self.mail_executor is not None:
+            self.mail_executor.shutdown(wait=True)
+            self.mail_executor = None
+        if self.attachment_executor is not None:
+            self.attachment_executor.shutdown(wait=True)
+            self.attachment_executor = None
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        if self.snapshot_store is not None:
+            self.snapshot_store.close()
+            self.snapshot_store = None
+        if self._esc_hook is not None:
+            try:
+                keyboard.unhook(self._esc_hook)
+            except Exception:
+                pass
+            self._esc_hook = None
         if close_browser and self.driver:
             try:
                 self.driver.quit()
             except Exception:
                 pass
-
-    def run(self) -> None:
-        success = False
-        try:
-            self.driver = self.start_webdriver()
-            self.browser_wait = WebDriverWait(self.driver, self.config.wait_time.get('browser', 6) + 10)
-            self.driver.get(self.config.url)
-            self.login()
-            self.navigate_entries()
-            self.filter_entries()
+        self.flush_logging()
+
+    def start_session(self) -> None:
+        self.session_applicants = 0
+        self.browser_hung = False
+        self.driver = self.start_webdriver()
+        self.browser_wait = CancellableWait(
+            self.driver, self.config.wait_time.get('browser', 6) + 10, self.cancel_token
+        )
+        self.instrument_command_counter(self.driver)
+        if self.profiler:
+            self.profiler.instrument_driver(self.driver)
+            self.profiler.instrument_wait(self.browser_wait)
+        self.driver.get(self.config.url)
+        self.login()
+
+    def restart_session(self) -> None:
+        self.logger.warning("ブラウザセッションを再起動します")
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None
+        self.browser_wait = None
+        self.start_session()
+
+    def status_routes(self) -> List[Tuple[str, str]]:
+        # 処理対象の選考ステータスと、処理後に設定するステータスの組
+        routes = self.config.status_routes or [{"source": "01", "target": "04"}]
+        return [(str(r["source"]), str(r.get("target", "04"))) for r in routes]
+
+    @timed_stage("fetch_entries")
+    def fetch_entries(self) -> Tuple[str, pd.DataFrame]:
+        self.navigate_entries()
+        csv_paths: List[str] = []
+        frames: List[pd.DataFrame] = []
+        list_index: Dict[str, ListEntry] = {}
+        for source, target in self.status_routes():
+            self.cancel_token.raise_if_cancelled()
+            self.filter_entries(source)
+            started = time.time()
             self.download_entries()
-            csv_path = self.get_latest_csv()
+            if self.list_scan_enabled():
+                list_index.update(self.scan_entry_list())
+            csv_path = self.get_latest_csv(since=started - 1)
             df = self.process_data(csv_path)
-            if not self.confirm_csv_data(df):
-                self.show_dialog("CSV確認で中断しました", is_error=True)
-                return
+            df["target_status"] = target
+            df["source_status"] = source
+            self.logger.info(f"ステータス {source} → {target}: {len(df)} 件")
+            csv_paths.append(csv_path)
+            frames.append(df)
+        self.list_index = list_index
+        merged = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        return "; ".join(csv_paths), self.apply_eligibility(self.diff_snapshot(merged))
+
+    def diff_snapshot(self, df: pd.DataFrame) -> pd.DataFrame:
+        settings = self.config.snapshot or {}
+        if not settings.get('enabled') or df.empty:
+            return df
+        if self.snapshot_store is None:
+            path = Path(settings.get('path') or self.run_stem.parent / "snapshots.sqlite3").expanduser()
+            self.snapshot_store = SnapshotStore(path)
+        classified = self.snapshot_store.classify(df)
+        self.snapshot_store.save(classified)
+        counts = classified["change"].value_counts()
+        handled = int(classified["handled"].sum())
+        self.logger.info(
+            f"CSV差分: 新規 {counts.get('new', 0)} 件 / 変更 {counts.get('changed', 0)} 件 / "
+            f"変更なし {counts.get('unchanged', 0)} 件（うち処理済み {handled} 件をスキップ）"
+        )
+        return classified[~classified["handled"]].reset_index(drop=True)
+
+    def record_outcome(self, record: ApplicantRecord, outcome: str, reason: str = "") -> None:
+        self.outcomes[outcome] += 1
+        self.progress.advance()
+        self.report.record(record, outcome, stage=_LOG_CONTEXT.get().get("step", ""), reason=reason)
+        key = record.key
+        if self.snapshot_store is not None and key and outcome in HANDLED_OUTCOMES:
+            self.snapshot_store.mark_handled(key)
+        if outcome in FAILURE_OUTCOMES:
+            entry = self.list_index.get(record.ID)
+            self.dead_letters.add(
+                record,
+                outcome,
+                stage=_LOG_CONTEXT.get().get("step", ""),
+                reason=reason,
+                detail_url=entry.detail_url if entry else "",
+            )
+        elif outcome in HANDLED_OUTCOMES:
+            self.dead_letters.remove(record.stem)
+
+    def record_failure(self, record: ApplicantRecord, exc: BaseException) -> None:
+        """応募者の失敗を記録する（メール送信済みなら失敗キューに入れず、ステータス更新のみ次回へ持ち越す）"""
+        if self.checkpoint.stage(record.stem) in ("mailed", "done"):
+            self.logger.warning(f"メール送信済みのため、ステータス更新は次回の実行で行います: {record.stem}")
+            self.record_outcome(record, "status_pending", reason=str(exc))
+            return
+        self.record_outcome(record, "failed", reason=str(exc))
+
+    def load_dead_letters(self) -> List[ApplicantRecord]:
+        """失敗した応募者のみを再処理対象として読み込む（CSV取得・一覧走査は行わない）"""
+        records = self.dead_letters.records()
+        self.list_index = {}
+        for record in records:
+            detail_url = self.dead_letters.entries[record.stem].get("detail_url")
+            if record.ID and detail_url:
+                self.list_index[record.ID] = ListEntry(record.ID, detail_url)
+        self.logger.info(f"失敗した応募者 {len(records)} 件を再処理します: {self.dead_letters.path}")
+        return records
+
+    def run(self, retry_failed: bool = False) -> None:
+        success = False
+        try:
+            if self.profiler:
+                self.profiler.start()
+            self.cleanup_downloads()
+            if retry_failed:
+                records = self.load_dead_letters()
+                if not records:
+                    self.logger.info("再処理対象の応募者はありません")
+                    success = True
+                    return
+                self.start_session()
+                # 検索ボックスを使うため応募者一覧までは遷移する
+                self.navigate_entries()
+                csv_path = str(self.dead_letters.path)
+            else:
+                self.start_session()
+                csv_path, df = self.fetch_entries()
+                if not self.confirm_csv_data(df):
+                    self.show_dialog("CSV確認で中断しました", is_error=True)
+                    return
+                records = self.build_applicant_records(df)
             self.load_template_data()
-            for _, row in df.iterrows():
-                overlay_closed = False
-                try:
-                    if int(row["E"]) >= 55:
-                        self.logger.info("55歳以上のためスキップ")
-                        continue
-                    pdf_url = self.search_and_open(row["B"])
-                    time.sleep(2)
-                    record_stem = self.build_record_file_stem(row)
-                    attachments: List[Path] = []
-                    pdf_downloaded = False
-                    if pdf_url:
-                        try:
-                            self.download_pdf_from_url(pdf_url, record_stem)
-                            pdf_downloaded = True
-                        except Exception as exc:
-                            self.logger.warning(f"PDFダウンロードに失敗しました: {exc}")
-                    if not pdf_downloaded:
-                        try:
-                            screenshot_path = self.capture_screenshot(record_stem)
-                            attachments.append(screenshot_path)
-                        except Exception as exc:
-                            self.logger.warning(f"スクリーンショット取得に失敗しました: {exc}")
-                    time.sleep(2)
-                    contact = self.find_contact_by_branch(row["AD"])
-                    if contact is None:
-                        self.logger.warning(f"支店名に一致する送信先が見つかりません: {row['AD']}")
-                        continue
-                    try:
-                        if pdf_downloaded:
-                            attachments = self.build_attachments(record_stem, allow_png_only=True)
-                        elif not attachments:
-                            attachments = self.build_attachments(record_stem, allow_png_only=True)
-                    except Exception as exc:
-                        self.logger.warning(f"添付ファイルが見つかりません: {exc}")
-                        continue
-                    applicant_email = str(row.get("I", "")).strip()
-                    if pdf_downloaded:
-                        # PDF取得できた場合 → 応募者アドレスは本文に載せない
-                        self.send_email(contact, attachments, applicant_email="")
-                    else:
-                        # スクショのみの場合 → 応募者アドレスを本文に記載
-                        self.send_email(contact, attachments, applicant_email=applicant_email)
-                    time.sleep(2)
-                    self.close_overlay()
-                    overlay_closed = True
-                    self.update_application_status("04")
-                    time.sleep(2)
-                finally:
-                    if not overlay_closed:
-                        self.close_overlay()
-                time.sleep(2)
+            self.process_entries(records, csv_path)
+            self.checkpoint.clear()
             success = True
+        except RunCancelled as exc:
+            self.logger.warning(f"処理を中断しました: {exc}")
+            if self.checkpoint.stages:
+                self.logger.info(f"チェックポイントを保存しました。次回実行時に再開します: {self.checkpoint.path}")
         except Exception as exc:
             self.logger.error("処理中に致命的なエラーが発生しました")
             self.logger.exception(exc)
             raise
         finally:
+            self.save_report()
+            self.save_profile()
             if success:
                 # 正常終了時はブラウザを開いたままにする
                 self.cleanup(close_browser=False)
@@ -700,15 +3260,544 @@ class AutomationScript:
                 # 例外時や強制終了時はブラウザも閉じる
                 self.cleanup(close_browser=True)
 
+    def run_daemon(self, interval_minutes: Optional[float] = None) -> None:
+        """ログイン済みのセッションを維持したまま、定期的に新規応募者のみを処理する"""
+        settings = self.config.polling or {}
+        interval = float(interval_minutes or settings.get('interval_minutes', 5)) * 60
+        seen: Set[str] = set()
+        try:
+            if self.profiler:
+                self.profiler.start()
+            self.start_session()
+            self.load_template_data()
+            self.cleanup_downloads()
+            while True:
+                self.cancel_token.raise_if_cancelled()
+                try:
+                    self.rotate_download_dir()
+                    csv_path, df = self.fetch_entries()
+                    records = self.build_applicant_records(df)
+                    new_records = [r for r in records if r.stem not in seen]
+                    self.logger.info(f"新規応募者 {len(new_records)} 件 / 対象 {len(records)} 件")
+                    failed: Set[str] = set()
+                    if new_records:
+                        failed = self.process_entries(new_records, csv_path)
+                    # 失敗した応募者は次回のポーリングで再処理する
+                    seen.update(r.stem for r in records if r.stem not in failed)
+                    self.checkpoint.clear()
+                    # 常駐中はポーリングごとにレポートを更新する
+                    self.save_report()
+                except APPLICANT_ERRORS as exc:
+                    self.logger.error(f"ポーリング処理でエラーが発生しました: {exc}")
+                    self.restart_session()
+                    self.breaker.reset()
+                self.logger.info(f"次回のポーリングまで {interval / 60:.1f} 分待機します")
+                self.pause(interval)
+        except RunCancelled as exc:
+            self.logger.warning(f"常駐処理を停止しました: {exc}")
+        except Exception as exc:
+            self.logger.error("常駐処理中に致命的なエラーが発生しました")
+            self.logger.exception(exc)
+            raise
+        finally:
+            self.save_report()
+            self.save_profile()
+            self.cleanup(close_browser=True)
+
+    def needs_browser(self, record: ApplicantRecord) -> bool:
+        if self.checkpoint.stage(record.stem) is not None:
+            return False
+        return not record.skip
+
+    def open_applicant(self, record: ApplicantRecord) -> Tuple[Optional[str], bool, Optional[str]]:
+        """応募者の詳細画面を開き、(レジュメURL, オーバーレイ不要か, ステータス選択のXPath) を返す"""
+        self.session_applicants += 1
+        prefetched = self.prefetched
+        self.prefetched = None
+        detail_xpath = self.list_scan_settings().get('detail_status_xpath')
+        if prefetched and prefetched.stem == record.stem:
+            # 先読み済みのタブへ切り替えるだけで済ませる
+            self.driver.switch_to.window(prefetched.handle)
+            self.detail_payload = prefetched.payload
+            self.logger.info(f"先読み済みの詳細画面を使用します: {record.stem}")
+            return prefetched.pdf_url, prefetched.direct, detail_xpath if prefetched.direct else None
+        entry = self.list_index.get(record.ID)
+        if entry:
+            # 詳細画面へ直接遷移した場合は閉じるオーバーレイがない
+            return self.with_retry("search", self.open_detail_directly, entry), True, detail_xpath
+        if self.list_index:
+            self.logger.warning(f"一覧に応募者IDが見つからないため検索に切り替えます: {record.ID}")
+        return self.with_retry("search", self.search_and_open, record.B, record.source_status), False, None
+
+    def lookahead_tab(self, current_handle: str) -> str:
+        others = [h for h in self.driver.window_handles if h != current_handle]
+        if others:
+            return others[0]
+        self.driver.switch_to.new_window("tab")
+        self.driver.get(self.list_url or self.config.url)
+        self.pause(self.config.wait_time.get('browser', 4))
+        return self.driver.current_window_handle
+
+    def prefetch_applicant(self, record: ApplicantRecord) -> None:
+        """メール送信中の空き時間に、次の応募者の詳細画面を別タブで開いておく"""
+        current_handle = self.driver.current_window_handle
+        current_payload = self.detail_payload
+        try:
+            handle = self.lookahead_tab(current_handle)
+            self.driver.switch_to.window(handle)
+            entry = self.list_index.get(record.ID)
+            if entry:
+                pdf_url = self.open_detail_directly(entry)
+            else:
+                pdf_url = self.search_and_open(record.B, record.source_status)
+            self.prefetched = PrefetchedDetail(record.stem, handle, pdf_url, self.detail_payload, bool(entry))
+            self.logger.info(f"次の応募者の詳細画面を先読みしました: {record.stem}")
+        except (AutomationError, WebDriverException) as exc:
+            self.prefetched = None
+            self.logger.warning(f"次の応募者の先読みに失敗しました: {exc}")
+        finally:
+            self.driver.switch_to.window(current_handle)
+            self.detail_payload = current_payload
+
+    def _send_email_in_worker(self, *args: Any, **kwargs: Any) -> None:
+        if pythoncom is not None:
+            pythoncom.CoInitialize()
+        try:
+            self.send_email(*args, **kwargs)
+        finally:
+            if pythoncom is not None:
+                pythoncom.CoUninitialize()
+
+    def send_email_with_lookahead(
+        self,
+        contact: ContactRecord,
+        attachments: List[Path],
+        applicant_email: str,
+        record: ApplicantRecord,
+        next_record: Optional[ApplicantRecord],
+    ) -> None:
+        if not self.config.lookahead or next_record is None:
+            self.send_email(contact, attachments, applicant_email=applicant_email, records=[record])
+            self.mark_mailed(record)
+            return
+        if self.mail_executor is None:
+            self.mail_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mail")
+        # Outlook送信（COM）は別スレッドで行い、その間にブラウザで次の応募者を開く
+        future: Future = self.mail_executor.submit(
+            copy_context().run,
+            self._send_email_in_worker,
+            contact,
+            attachments,
+            applicant_email=applicant_email,
+            records=[record],
+        )
+        try:
+            self.prefetch_applicant(next_record)
+        finally:
+            # 先読みが中断・失敗しても送信はワーカーで完了するため、結果を待って送信済みを記録してから例外を伝える
+            future.result()
+            self.mark_mailed(record)
+
+    def mark_mailed(self, record: ApplicantRecord) -> None:
+        # 送信後は処理期限で中断させない（送信済みの応募者を失敗扱いにして再送しないため）
+        self.disarm_deadline()
+        self.checkpoint.mark(record.stem, "mailed")
+
+    def digest_enabled(self) -> bool:
+        return bool((self.config.digest or {}).get('enabled'))
+
+    def queue_digest(
+        self, record: ApplicantRecord, contact: ContactRecord, attachments: List[Path], applicant_email: str
+    ) -> None:
+        size = sum(p.stat().st_size for p in attachments if p.exists())
+        self.digest_items.setdefault(contact, []).append(DigestItem(record, attachments, applicant_email, size))
+        self.logger.info(f"まとめ送信に追加しました: {contact.branch} ({len(self.digest_items[contact])} 件目)")
+
+    def split_digest(self, items: List[DigestItem]) -> List[List[DigestItem]]:
+        """1通あたりの添付合計サイズが上限を超えないように分割する"""
+        settings = self.config.digest or {}
+        limit = float(settings.get('max_attachment_mb', 20)) * 1024 * 1024
+        max_applicants = int(settings.get('max_applicants', 0) or 0)
+        batches: List[List[DigestItem]] = []
+        current: List[DigestItem] = []
+        current_size = 0
+        for item in items:
+            over_size = current_size + item.size > limit
+            over_count = max_applicants and len(current) >= max_applicants
+            if current and (over_size or over_count):
+                batches.append(current)
+                current, current_size = [], 0
+            current.append(item)
+            current_size += item.size
+        if current:
+            batches.append(current)
+        return batches
+
+    def digest_summary(self, items: List[DigestItem]) -> List[str]:
+        lines = []
+        for number, item in enumerate(items, start=1):
+            record = item.record
+            age = format_age(record.E)
+            line = f"{number}. {record.B}（{age}歳）{record.AK}" if age else f"{number}. {record.B} {record.AK}"
+            if item.applicant_email:
+                line += f" / 応募者メール: {item.applicant_email}"
+            lines.append(line)
+        return lines
+
+    def send_digests(self) -> Set[str]:
+        """支店（送信先）ごとにまとめてメールを送り、送信に失敗した応募者のキーを返す"""
+        failed: Set[str] = set()
+        pending, self.digest_items = self.digest_items, {}
+        for contact, items in pending.items():
+            for batch in self.split_digest(items):
+                self.cancel_token.raise_if_cancelled()
+                set_log_context(applicant=None, step="mail")
+                attachments = [path for item in batch for path in item.attachments]
+                try:
+                    self.send_email(
+                        contact,
+                        attachments,
+                        summary_lines=self.digest_summary(batch),
+                        records=[item.record for item in batch],
+                    )
+                except Exception as exc:
+                    self.logger.warning(f"まとめメールの送信に失敗しました: {contact.branch}: {exc}")
+                    for item in batch:
+                        self.record_outcome(item.record, "failed", reason=f"まとめメール送信失敗: {exc}")
+                        failed.add(item.record.stem)
+                    continue
+                self.report.events["digest_mails"] += 1
+                for item in batch:
+                    self.checkpoint.mark(item.record.stem, "mailed")
+        return failed
+
+    def complete_digest_statuses(self, records: List[ApplicantRecord]) -> Set[str]:
+        """まとめメール送信後に、送信済みの応募者のステータスを更新する"""
+        failed: Set[str] = set()
+        for record in records:
+            if self.checkpoint.stage(record.stem) != "mailed":
+                continue
+            self.cancel_token.raise_if_cancelled()
+            overlay_closed = False
+            set_log_context(applicant=record.stem, step=None)
+            self.maintain_browser(record.source_status)
+            self.wait_for_circuit()
+            self.arm_deadline(record.stem)
+            try:
+                _, overlay_closed, status_xpath = self.open_applicant(record)
+                self.pause(2)
+                if not overlay_closed:
+                    self.close_overlay()
+                    overlay_closed = True
+                self.update_application_status(record.target_status, status_xpath)
+                self.checkpoint.mark(record.stem, "done")
+                self.breaker.record_success()
+                self.record_outcome(record, "sent")
+            except APPLICANT_ERRORS as exc:
+                self.logger.warning(f"ステータス更新に失敗したためスキップします: {record.stem}: {exc}")
+                self.breaker.record_failure()
+                self.record_failure(record, exc)
+                failed.add(record.stem)
+            finally:
+                self.disarm_deadline()
+                if not overlay_closed and not self.cancel_token.cancelled:
+                    self.close_overlay()
+            self.pause(2)
+        return failed
+
+    def process_entries(self, records: List[ApplicantRecord], csv_path: str) -> Set[str]:
+        """応募者ごとの処理を行い、失敗した応募者のキーを返す"""
+        failed: Set[str] = set()
+        self.checkpoint.load(csv_path)
+        if self.checkpoint.stages:
+            self.logger.info(f"前回中断時のチェックポイントから再開します: {len(self.checkpoint.stages)} 件処理済み")
+        self.progress.start(len(records))
+        for index, record in enumerate(records):
+            self.cancel_token.raise_if_cancelled()
+            self.progress.set_queue("待機", len(records) - index - 1)
+            self.progress.set_queue("失敗", len(self.dead_letters.entries))
+            overlay_closed = False
+            record_stem = record.stem
+            set_log_context(applicant=record_stem, step=None)
+            stage = self.checkpoint.stage(record_stem)
+            if stage == "done":
+                self.progress.advance()
+                continue
+            commands_before = self.webdriver_commands
+            if not record.skip:
+                self.maintain_browser(record.source_status)
+            self.wait_for_circuit()
+            self.arm_deadline(record_stem)
+            try:
+                if record.skip:
+                    self.logger.info(f"{ELIGIBILITY_RULE_LABELS.get(record.skip, record.skip)}の条件により対象外のためスキップ")
+                    self.record_outcome(record, f"skipped_{record.skip}")
+                    continue
+                pdf_url, overlay_closed, status_xpath = self.open_applicant(record)
+                self.pause(2)
+                if stage == "mailed":
+                    # メール送信済みで中断した応募者はステータス更新のみ行う
+                    self.logger.info(f"メール送信済みのためステータス更新のみ行います: {record_stem}")
+                    if not overlay_closed:
+                        self.close_overlay()
+                        overlay_closed = True
+                    self.update_application_status(record.target_status, status_xpath)
+                    self.checkpoint.mark(record_stem, "done")
+                    self.breaker.record_success()
+                    self.record_outcome(record, "resumed")
+                    continue
+                attachments: List[Path] = []
+                pdf_downloaded = False
+                if pdf_url:
+                    try:
+                        self.download_pdf_from_url(pdf_url, record_stem)
+                        pdf_downloaded = True
+                    except Exception as exc:
+                        self.logger.warning(f"PDFダウンロードに失敗しました: {exc}")
+                if not pdf_downloaded:
+                    self.report.events["screenshot_fallback"] += 1
+                    try:
+                        screenshot_path = self.capture_screenshot(record_stem)
+                        attachments.append(screenshot_path)
+                        self.submit_attachment_optimization(screenshot_path)
+                    except Exception as exc:
+                        self.logger.warning(f"スクリーンショット取得に失敗しました: {exc}")
+                self.pause(2)
+                contact = self.find_contact_by_branch(record.AD)
+                if contact is None:
+                    self.logger.warning(f"支店名に一致する送信先が見つかりません: {record.AD}")
+                    self.record_outcome(record, "no_contact", reason=f"送信先が見つかりません: {record.AD}")
+                    continue
+                try:
+                    if pdf_downloaded:
+                        attachments = self.build_attachments(record_stem, allow_png_only=True)
+                    elif not attachments:
+                        attachments = self.build_attachments(record_stem, allow_png_only=True)
+                except Exception as exc:
+                    self.logger.warning(f"添付ファイルが見つかりません: {exc}")
+                    self.record_outcome(record, "no_attachment", reason=str(exc))
+                    continue
+                # PDF取得できた場合 → 応募者アドレスは本文に載せない
+                # スクショのみの場合 → 応募者アドレスを本文に記載
+                applicant_email = "" if pdf_downloaded else record.I
+                attachments = self.resolve_attachments(attachments)
+                if self.digest_enabled():
+                    # まとめ送信では送信先ごとに溜めておき、全員分の取得後に送信・ステータス更新する
+                    self.queue_digest(record, contact, attachments, applicant_email)
+                    self.checkpoint.mark(record_stem, "queued")
+                    self.breaker.record_success()
+                    continue
+                next_record = next((r for r in records[index + 1:] if self.needs_browser(r)), None)
+                try:
+                    self.send_email_with_lookahead(contact, attachments, applicant_email, record, next_record)
+                except MailSendError as exc:
+                    # 送信先・添付の問題はサイト側の障害ではないため、サーキットブレーカーには数えない
+                    self.logger.warning(f"メール送信に失敗したためスキップします: {record_stem}: {exc}")
+                    set_log_context(step="mail")
+                    self.record_outcome(record, "failed", reason=str(exc))
+                    failed.add(record_stem)
+                    continue
+                self.pause(2)
+                if not overlay_closed:
+                    self.close_overlay()
+                    overlay_closed = True
+                self.update_application_status(record.target_status, status_xpath)
+                self.checkpoint.mark(record_stem, "done")
+                self.breaker.record_success()
+                self.record_outcome(record, "sent")
+            except APPLICANT_ERRORS as exc:
+                # 再試行しても失敗した応募者はスキップし、連続失敗はサーキットブレーカーで判定する
+                self.logger.warning(f"応募者の処理に失敗したためスキップします: {record_stem}: {exc}")
+                self.breaker.record_failure()
+                self.record_failure(record, exc)
+                failed.add(record_stem)
+                continue
+            finally:
+                self.disarm_deadline()
+                if not overlay_closed and not self.cancel_token.cancelled:
+                    self.close_overlay()
+                self.logger.info(
+                    f"WebDriverコマンド数: {self.webdriver_commands - commands_before} 回 ({record_stem})"
+                )
+            self.pause(2)
+        if self.digest_items:
+            failed |= self.send_digests()
+            failed |= self.complete_digest_statuses(records)
+        set_log_context(applicant=None, step=None)
+        return failed
+
+
+def run_account(
+    config_path: str,
+    config_data: Dict[str, Any],
+    profile_mode: Optional[str] = None,
+    retry_failed: bool = False,
+    daemon: Optional[float] = None,
+) -> Dict[str, Any]:
+    """1アカウント分の処理（複数アカウント同時実行時に子プロセスで実行される）"""
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"account": config_data.get('account_name') or Path(config_path).stem, "status": "success"}
+    automation = AutomationScript(config_path, profile_mode=profile_mode, config_data=config_data)
+    try:
+        if daemon is not None:
+            automation.run_daemon(daemon or None)
+        else:
+            automation.run(retry_failed=retry_failed)
+    except Exception as exc:
+        result["status"] = "error"
+        result["error"] = str(exc)
+    result["outcomes"] = dict(automation.outcomes)
+    result["report"] = str(automation.run_stem.with_name(f"{automation.run_stem.name}_report.json"))
+    result["elapsed_seconds"] = round(time.perf_counter() - started, 1)
+    return result
+
+
+def prepare_account_configs(config_paths: List[Path]) -> List[Dict[str, Any]]:
+    """各アカウントの設定を読み込み、ダウンロード先とログ出力先をアカウントごとに分離する"""
+    accounts: List[Dict[str, Any]] = []
+    used_names: Counter = Counter()
+    for path in config_paths:
+        # 復号パスワードの入力は子プロセス起動前に親プロセスでまとめて行う
+        data = read_config_data(path)
+        name = str(data.get('account_name') or path.stem)
+        used_names[name] += 1
+        if used_names[name] > 1:
+            name = f"{name}_{used_names[name]}"
+        data['account_name'] = name
+        base_folder = Path(data.get('download_folder') or '~/Downloads/pdf').expanduser()
+        data['download_folder'] = str(base_folder / name)
+        data['log_dir'] = str(Path(data.get('log_dir') or 'logs') / name)
+        data['screenshot_source'] = 'browser'
+        # 複数プロセスが同じコンソールに進捗行を描くと表示が崩れるため、子プロセスでは表示しない
+        data['progress'] = False
+        accounts.append({"path": str(path), "data": data})
+    return accounts
+
+
+def cleanup_downloads(config_paths: List[Path]) -> None:
+    """ブラウザを起動せず、各アカウントのダウンロードフォルダに保持ポリシーを適用する"""
+    if len(config_paths) > 1:
+        targets = [(a["path"], a["data"]) for a in prepare_account_configs(config_paths)]
+    else:
+        targets = [(str(config_paths[0]), None)]
+    for path, data in targets:
+        automation = AutomationScript(path, config_data=data)
+        try:
+            automation.cleanup_downloads()
+        finally:
+            automation.cleanup(close_browser=False)
+
+
+def split_rate_limit(settings: Optional[Dict[str, Any]], workers: int) -> Optional[Dict[str, Any]]:
+    """同時実行するプロセス数でレート制限を等分し、Airワークへの合計リクエストレートを設定値に保つ"""
+    if not settings or not settings.get('enabled') or workers <= 1:
+        return settings
+    shared = dict(settings)
+    shared['rate'] = float(settings.get('rate', 1.0)) / workers
+    shared['min_rate'] = float(settings.get('min_rate', 0.1)) / workers
+    shared['increase_step'] = float(settings.get('increase_step', 0.05)) / workers
+    shared['burst'] = max(1, int(settings.get('burst', 2)) // workers)
+    return shared
+
+
+def run_accounts(
+    config_paths: List[Path],
+    profile_mode: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    retry_failed: bool = False,
+    daemon: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    accounts = prepare_account_configs(config_paths)
+    workers = min(max_workers or len(accounts), len(accounts))
+    for account in accounts:
+        account["data"]['rate_limit'] = split_rate_limit(account["data"].get('rate_limit'), workers)
+    started = time.perf_counter()
+    results: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                run_account, account["path"], account["data"], profile_mode, retry_failed, daemon
+            ): account["data"]['account_name']
+            for account in accounts
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as exc:
+                result = {"account": futures[future], "status": "error", "error": str(exc), "outcomes": {}}
+            results.append(result)
+            print(f"[{result['account']}] {result['status']} {result.get('outcomes')} {result.get('error', '')}")
+
+    elapsed = time.perf_counter() - started
+    total = Counter()
+    for result in results:
+        total.update(result.get("outcomes") or {})
+    sent = total.get("sent", 0)
+    per_minute = sent / (elapsed / 60) if elapsed > 0 else 0.0
+    print("=" * 50)
+    print(f"全 {len(results)} アカウント完了: 送信 {sent} 件 / {elapsed:.0f} 秒 ({per_minute:.1f} 件/分)")
+    print(f"内訳: {dict(total)}")
+    print("=" * 50)
+    return results
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Airワーク自動操作")
+    parser.add_argument("password", nargs="?", help="プログラム実行用パスワード")
+    parser.add_argument("--verify", action="store_true", help="パスワード検証のみ行う")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="cprofile",
+        choices=PROFILE_MODES,
+        help="プロファイリングを有効化し、結果を logs/ に保存する",
+    )
+    parser.add_argument(
+        "--benchmark-page-load",
+        type=int,
+        nargs="?",
+        const=3,
+        metavar="ROUNDS",
+        help="既定設定と page_load 設定で応募者一覧・詳細画面の読み込み時間を比較して終了する",
+    )
+    parser.add_argument(
+        "--config",
+        action="append",
+        dest="configs",
+        metavar="PATH",
+        help="設定ファイル（config.yaml / config.enc）。複数指定するとアカウントごとに並列実行する",
+    )
+    parser.add_argument("--parallel", type=int, metavar="N", help="複数アカウント実行時の最大同時実行数")
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="前回までに失敗した応募者（logs/dead_letters.json）のみを再処理する",
+    )
+    parser.add_argument(
+        "--cleanup-downloads",
+        action="store_true",
+        help="downloads.retention に従ってダウンロードフォルダの古い実行フォルダを圧縮・削除して終了する",
+    )
+    parser.add_argument(
+        "--daemon",
+        type=float,
+        nargs="?",
+        const=0,
+        metavar="MINUTES",
+        help="常駐モード: ブラウザを開いたまま定期的に新規応募者のみを処理する（省略時は polling.interval_minutes）",
+    )
+    return parser.parse_args(argv)
+
 
 def main() -> None:
-    if len(sys.argv) < 2:
+    args = parse_args(sys.argv[1:])
+    if not args.password:
         print("パスワードが必要です")
         sys.exit(1)
 
-    password = sys.argv[1]
+    password = args.password
 
-    if len(sys.argv) > 2 and sys.argv[2] == "--verify":
+    if args.verify:
         if not check_password(password):
             print("パスワードが違います")
             sys.exit(1)
@@ -718,10 +3807,42 @@ def main() -> None:
         print("パスワードが違います")
         sys.exit(1)
 
-    config_path = Path(__file__).parent / "config.yaml"
-    automation = AutomationScript(str(config_path))
+    config_paths = [Path(p).expanduser() for p in args.configs or []]
+    if args.cleanup_downloads:
+        cleanup_downloads(config_paths or [Path(__file__).parent / "config.yaml"])
+        return
+    if len(config_paths) > 1:
+        if args.benchmark_page_load:
+            print("--benchmark-page-load は --config を1つだけ指定して実行してください")
+            sys.exit(1)
+        if args.daemon is not None and args.parallel and args.parallel < len(config_paths):
+            # 常駐モードのプロセスは終了しないため、同時実行数を超えたアカウントが開始されない
+            print("--daemon を複数アカウントで使う場合は --parallel をアカウント数以上にしてください")
+            sys.exit(1)
+        results = run_accounts(
+            config_paths,
+            profile_mode=args.profile,
+            max_workers=args.parallel,
+            retry_failed=args.retry_failed,
+            daemon=args.daemon,
+        )
+        if any(r["status"] != "success" for r in results):
+            sys.exit(1)
+        return
+
+    config_path = config_paths[0] if config_paths else Path(__file__).parent / "config.yaml"
+    automation = AutomationScript(str(config_path), profile_mode=args.profile)
+    if args.benchmark_page_load:
+        try:
+            automation.benchmark_page_load(args.benchmark_page_load)
+        finally:
+            automation.cleanup(close_browser=False)
+        return
     try:
-        automation.run()
+        if args.daemon is not None:
+            automation.run_daemon(args.daemon or None)
+        else:
+            automation.run(retry_failed=args.retry_failed)
     except Exception as exc:
         automation.logger.error("全体処理で致命的なエラーが発生しました")
         automation.logger.exception(exc)